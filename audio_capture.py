@@ -0,0 +1,117 @@
+"""
+VoiceGrab Audio Capture
+Preallocated ring buffer fed by the PortAudio callback
+"""
+
+import numpy as np
+
+
+class CaptureEngine:
+    """Ring buffer capture engine with a single-writer, lock-free write index.
+
+    The audio callback is the only writer: it copies each block into a
+    preallocated NumPy buffer with one slice assignment and then publishes
+    the new write position. Readers hand out segments as views into the
+    buffer, so no per-block allocation or concatenation is needed.
+    """
+
+    def __init__(self, sample_rate=16000, capacity_seconds=370, channels=1, dtype='float32'):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.capacity = int(sample_rate * capacity_seconds)
+        self._buffer = np.zeros((self.capacity, channels), dtype=dtype)
+
+        # Absolute sample positions (monotonic, never wrapped)
+        self._write_pos = 0
+        self._read_pos = 0
+
+        # Number of samples lost because the reader fell a full buffer behind
+        self.overruns = 0
+
+    # --- Writer side (audio callback thread) ---
+
+    def write(self, indata):
+        """Copy one callback block into the ring (called from the audio callback)"""
+        frames = len(indata)
+        if frames > self.capacity:
+            indata = indata[-self.capacity:]
+            frames = self.capacity
+
+        pos = self._write_pos
+        start = pos % self.capacity
+        end = start + frames
+        if end <= self.capacity:
+            self._buffer[start:end] = indata
+        else:
+            split = self.capacity - start
+            self._buffer[start:] = indata[:split]
+            self._buffer[:end - self.capacity] = indata[split:]
+
+        # Publish only after the samples are in place
+        self._write_pos = pos + frames
+
+    # --- Reader side ---
+
+    @property
+    def write_pos(self):
+        """Absolute position of the next sample to be written"""
+        return self._write_pos
+
+    @property
+    def read_pos(self):
+        """Absolute position of the first unread sample"""
+        return self._read_pos
+
+    def available(self):
+        """Number of captured samples not yet handed out"""
+        self._check_overrun()
+        return self._write_pos - self._read_pos
+
+    def start_from(self, frames_back):
+        """Start a new read window `frames_back` samples before the write position.
+
+        The callback keeps writing between recordings, so this hands the
+        last moments before the hotkey press (the pre-roll) to the next
+        recording without any extra buffering.
+        """
+        pos = self._write_pos
+        self._read_pos = max(pos - frames_back, pos - self.capacity, 0)
+
+    def clear(self):
+        """Drop everything captured so far"""
+        self._read_pos = self._write_pos
+
+    def view(self, start, end):
+        """Return samples [start, end) in absolute positions.
+
+        The result is a zero-copy view unless the range wraps around the end
+        of the ring, in which case the two halves are joined into a new array.
+        Views stay valid until the writer laps them (one full buffer later).
+        """
+        start = max(start, self._write_pos - self.capacity)
+        end = min(end, self._write_pos)
+        if end <= start:
+            return self._buffer[:0]
+
+        a = start % self.capacity
+        b = a + (end - start)
+        if b <= self.capacity:
+            return self._buffer[a:b]
+        return np.concatenate((self._buffer[a:], self._buffer[:b - self.capacity]))
+
+    def take(self, frames=None):
+        """Hand out the next unread segment and advance the read position"""
+        self._check_overrun()
+        end = self._write_pos
+        if frames is not None:
+            end = min(end, self._read_pos + frames)
+        segment = self.view(self._read_pos, end)
+        self._read_pos = end
+        return segment
+
+    def _check_overrun(self):
+        """Skip samples that the writer has already overwritten"""
+        oldest = self._write_pos - self.capacity
+        if self._read_pos < oldest:
+            self.overruns += oldest - self._read_pos
+            self._read_pos = oldest
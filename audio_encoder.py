@@ -0,0 +1,204 @@
+"""
+VoiceGrab Audio Encoder
+Incremental in-memory encoding of captured audio while recording
+"""
+
+import io
+import sys
+import time
+import threading
+
+import numpy as np
+import soundfile as sf
+
+
+# Upload formats: name -> (libsndfile format, subtype, file extension)
+FORMATS = {
+    'wav': ('WAV', 'PCM_16', '.wav'),
+    'flac': ('FLAC', 'PCM_16', '.flac'),
+    'opus': ('OGG', 'OPUS', '.ogg'),
+}
+
+
+# libsndfile maps Opus compression level 0.0..1.0 linearly onto this
+# per-channel bitrate range (bits per second)
+OPUS_MAX_BITRATE = 256000
+OPUS_MIN_BITRATE = 6000
+
+
+def opus_compression_level(bitrate_kbps, channels=1):
+    """Convert a target Opus bitrate (kbps) to a libsndfile compression level"""
+    bitrate = min(max(bitrate_kbps * 1000 / channels, OPUS_MIN_BITRATE), OPUS_MAX_BITRATE)
+    return (OPUS_MAX_BITRATE - bitrate) / (OPUS_MAX_BITRATE - OPUS_MIN_BITRATE)
+
+
+def get_extension(fmt):
+    """File extension for an upload format"""
+    return FORMATS.get(fmt, FORMATS['wav'])[2]
+
+
+def audio_duration(data):
+    """Seconds of audio in an encoded file held in memory (0.0 if unreadable)"""
+    try:
+        return sf.info(io.BytesIO(bytes(data))).duration
+    except Exception:
+        return 0.0
+
+
+def decode_audio(data):
+    """Decode an encoded file held in memory to (float32 mono samples, sample rate)"""
+    audio, sample_rate = sf.read(io.BytesIO(bytes(data)), dtype='float32', always_2d=True)
+    return audio.mean(axis=1), sample_rate
+
+
+def open_writer(buffer, sample_rate, channels=1, fmt='wav', bitrate=24):
+    """Open a SoundFile writer on a file-like buffer (bitrate in kbps, Opus only)"""
+    sf_format, subtype, _ = FORMATS.get(fmt, FORMATS['wav'])
+    compression_level = opus_compression_level(bitrate, channels) if subtype == 'OPUS' else None
+    return sf.SoundFile(buffer, 'w', samplerate=sample_rate, channels=channels,
+                        format=sf_format, subtype=subtype, compression_level=compression_level)
+
+
+def encode_audio(audio, sample_rate, fmt='wav', bitrate=24):
+    """Encode a whole clip in one go (fallback when no stream is available)"""
+    buffer = io.BytesIO()
+    channels = audio.shape[1] if audio.ndim > 1 else 1
+    with open_writer(buffer, sample_rate, channels, fmt, bitrate) as f:
+        f.write(audio)
+    return buffer.getvalue()
+
+
+class StreamingEncoder:
+    """Encodes audio from a CaptureEngine block by block as it arrives.
+
+    A feeder thread follows the capture write position and encodes new
+    samples into an in-memory file, so when recording stops only the
+    last fraction of a second is left to encode. An optional trimmer
+    (voice_activity.SilenceTrimmer) drops silence and an optional
+    stretcher (time_stretch.TimeStretcher) speeds speech up before encoding.
+    """
+
+    def __init__(self, capture, start_pos, fmt='wav', bitrate=24, interval=0.1, trimmer=None, stretcher=None):
+        self.capture = capture
+        self.fmt = fmt
+        self.interval = interval
+        self.trimmer = trimmer
+        self.stretcher = stretcher
+
+        self._buffer = io.BytesIO()
+        self._writer = open_writer(self._buffer, capture.sample_rate, capture.channels, fmt, bitrate)
+        self._pos = start_pos  # absolute capture position encoded so far
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def position(self):
+        """Absolute capture position up to which audio is encoded"""
+        return self._pos
+
+    def start(self):
+        """Start following the capture buffer in the background"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._encode_until(self.capture.write_pos)
+            except Exception as e:
+                print(f"[DEBUG] Encoder error: {e}")
+                return
+
+    def _encode_until(self, end_pos):
+        if end_pos <= self._pos:
+            return
+        data = self.capture.view(self._pos, end_pos)
+        if self.trimmer:
+            data = self.trimmer.feed(data)
+        if self.stretcher:
+            data = self.stretcher.feed(data)
+        self._writer.write(data)
+        self._pos = end_pos
+
+    def _halt(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def finish(self, end_pos):
+        """Encode the remaining tail up to end_pos and return the file bytes.
+
+        Returns None if the stream already ran past end_pos (the caller
+        should then encode the segment in one go).
+        """
+        self._halt()
+        if self._pos > end_pos:
+            self._writer.close()
+            return None
+        self._encode_until(end_pos)
+        tail = self.trimmer.flush() if self.trimmer else None
+        if self.stretcher:
+            if tail is not None:
+                self._writer.write(self.stretcher.feed(tail))
+            tail = self.stretcher.flush()
+        if tail is not None:
+            self._writer.write(tail)
+        self._writer.close()
+        return self._buffer.getvalue()
+
+    def cancel(self):
+        """Stop encoding and discard the output"""
+        self._halt()
+        self._writer.close()
+
+
+def synthetic_speech(seconds=30, sample_rate=16000):
+    """Speech-like test clip: voiced harmonics with syllable rhythm and pauses"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    phrases = (np.sin(2 * np.pi * 0.15 * t) > -0.3).astype(float)
+    noise = np.random.default_rng(0).normal(0, 0.003, len(t))
+    return (0.2 * voiced * syllables * phrases + noise).astype('float32')
+
+
+def benchmark(clips, bitrate=24, repeats=3):
+    """Print size ratio and encode time per upload format for each clip"""
+    for name, audio, sample_rate in clips:
+        duration = len(audio) / sample_rate
+        print(f"\n{name} ({duration:.1f}s @ {sample_rate} Hz)")
+        print(f"  {'format':<8}{'size':>10}{'ratio':>8}{'encode':>10}{'x realtime':>12}")
+        wav_size = None
+        for fmt in FORMATS:
+            try:
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    data = encode_audio(audio, sample_rate, fmt, bitrate)
+                elapsed = (time.perf_counter() - start) / repeats
+            except Exception as e:
+                print(f"  {fmt:<8} failed: {e}")
+                continue
+            if wav_size is None:
+                wav_size = len(data)
+            ratio = len(data) / wav_size
+            speed = duration / elapsed if elapsed else float('inf')
+            print(f"  {fmt:<8}{len(data) / 1024:>8.0f}KB{ratio:>8.2f}{elapsed * 1000:>8.1f}ms{speed:>11.0f}x")
+
+
+if __name__ == "__main__":
+    # Benchmark: python audio_encoder.py [clip.wav ...] [--bitrate=24]
+    bitrate = 24
+    clips = []
+    for arg in sys.argv[1:]:
+        if arg.startswith('--bitrate='):
+            bitrate = float(arg.split('=', 1)[1])
+            continue
+        audio, sample_rate = sf.read(arg, dtype='float32')
+        clips.append((arg, audio, sample_rate))
+    if not clips:
+        clips.append(("synthetic speech", synthetic_speech(), 16000))
+    print(f"Opus bitrate: {bitrate:g} kbps")
+    benchmark(clips, bitrate)
@@ -0,0 +1,183 @@
+"""
+VoiceGrab Chunked Transcription
+Long recordings split at pauses, transcribed in parallel and stitched
+"""
+
+import asyncio
+import re
+
+from audio_encoder import encode_audio
+from voice_activity import find_quietest_point
+
+
+def plan_chunks(audio_length, sample_rate, audio=None, chunk_seconds=60.0, overlap=1.0, window=8.0):
+    """Split [0, audio_length) into chunks of about chunk_seconds.
+
+    Each cut is the quietest moment in the last `window` seconds before
+    the target length (when `audio` is given), so it falls in a pause.
+    Returns [(start, end, cut_start, cut_end)] in samples: the chunk
+    covers cut_start..cut_end plus `overlap` seconds on either side.
+    """
+    size = int(chunk_seconds * sample_rate)
+    margin = int(overlap * sample_rate)
+    cuts = [0]
+    while audio_length - cuts[-1] > size * 1.25:  # no tiny last chunk
+        target = cuts[-1] + size
+        search = max(cuts[-1] + size // 2, target - int(window * sample_rate))
+        cut = target
+        if audio is not None:
+            cut = search + find_quietest_point(audio[search:target], sample_rate)
+        cuts.append(cut)
+    cuts.append(audio_length)
+    return [(max(0, a - margin), min(audio_length, b + margin), a, b) for a, b in zip(cuts, cuts[1:])]
+
+
+_WORD = re.compile(r"[\w']+")
+
+
+def _norm(word):
+    return ''.join(_WORD.findall(word.lower()))
+
+
+def merge_text(left, right, max_words=12):
+    """Join two transcripts whose ends overlap, dropping the repeated words.
+
+    The longest run of (up to max_words) words that ends `left` and
+    starts `right`, ignoring case and punctuation, is kept only once.
+    """
+    a, b = left.split(), right.split()
+    for size in range(min(max_words, len(a), len(b)), 0, -1):
+        if [_norm(w) for w in a[-size:]] == [_norm(w) for w in b[:size]]:
+            return ' '.join(a + b[size:])
+    return ' '.join(a + b)
+
+
+def _word_owners(tokens, words):
+    """Index of the text token each word belongs to, or None if they do not line up.
+
+    Whisper's word list has no punctuation ("Hello, world." has the words
+    "Hello" and "world"), so words are matched against the text with case
+    and punctuation ignored.
+    """
+    chars, owners_of_chars = [], []
+    for index, token in enumerate(tokens):
+        normalized = _norm(token)
+        chars.append(normalized)
+        owners_of_chars += [index] * len(normalized)
+    stream = ''.join(chars)
+    owners, position = [], 0
+    for word in words:
+        normalized = _norm(word['word'])
+        if not stream.startswith(normalized, position):
+            return None
+        owners.append(owners_of_chars[position] if position < len(stream) else len(tokens) - 1)
+        position += len(normalized)
+    return owners
+
+
+def _cut_text(text, words, keep):
+    """The part of text between the first and the last kept word, punctuation included"""
+    tokens = text.split()
+    owners = _word_owners(tokens, words)
+    if owners is None:
+        return None
+    kept = [index for index, word in enumerate(words) if keep(word)]
+    if not kept:
+        return ''
+    first, last = kept[0], kept[-1]
+    # Tokens without words (dashes, stray punctuation) go with the word before them
+    start = owners[first - 1] + 1 if first > 0 else 0
+    end = owners[last + 1] if last + 1 < len(words) else len(tokens)
+    return ' '.join(tokens[min(start, owners[first]):max(end, owners[last] + 1)])
+
+
+def stitch(chunks, responses, sample_rate):
+    """Text of all chunks in order, with the overlaps counted once.
+
+    With word timestamps (verbose_json) each chunk keeps the words whose
+    midpoint falls in its cut_start..cut_end, and its `text` is cut at
+    those words, so punctuation and casing survive. Without timestamps, or
+    if the words do not line up with the text, the overlapping words are
+    found by merge_text().
+    """
+    if all(response.get('words') for response in responses):
+        parts = []
+        for (start, _, cut_start, cut_end), response in zip(chunks, responses):
+            keep = lambda word: cut_start <= start + (word['start'] + word['end']) / 2 * sample_rate < cut_end
+            part = _cut_text(response.get('text', ''), response['words'], keep)
+            if part is None:
+                break
+            parts.append(part)
+        else:
+            return ' '.join(part for part in parts if part)
+    text = ''
+    for response in responses:
+        text = merge_text(text, response.get('text', '').strip()) if text else response.get('text', '').strip()
+    return text
+
+
+async def transcribe_chunked(audio, sample_rate, request, chunk_seconds=60.0, overlap=1.0, workers=4,
+                             fmt='flac', bitrate=24, to_thread=asyncio.to_thread):
+    """Transcribe a long clip (float32 samples) as parallel chunks.
+
+    `request(encoded, index, seconds)` is a coroutine returning one
+    chunk's decoded response; ask for verbose_json with word timestamps
+    for exact stitching. At most `workers` chunks are encoded or in flight
+    at once, so the wall-clock time is close to the slowest chunk's.
+    Returns (text, number of chunks).
+    """
+    chunks = plan_chunks(len(audio), sample_rate, audio, chunk_seconds, overlap)
+    slots = asyncio.Semaphore(workers)
+
+    async def run(index, start, end):
+        async with slots:
+            encoded = await to_thread(encode_audio, audio[start:end], sample_rate, fmt, bitrate)
+            return await request(encoded, index, (end - start) / sample_rate)
+
+    tasks = [asyncio.ensure_future(run(index, start, end)) for index, (start, end, _, _) in enumerate(chunks)]
+    try:
+        responses = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()  # one chunk failed (or ESC): drop the rest
+    return stitch(chunks, responses, sample_rate), len(chunks)
+
+
+def benchmark(minutes=10, chunk_seconds=60.0, workers=10, per_second=0.05):
+    """A long dictation against a stand-in server: one upload vs parallel chunks"""
+    import time
+    from audio_encoder import synthetic_speech
+    from stand_in_server import StandInServer, LatencyProfile
+    from transcription_client import OpenAICompatibleBackend
+
+    rate = 16000
+    audio = synthetic_speech(minutes * 60, rate)
+    print(f"{minutes} min of speech, stand-in takes 0.3 s + {per_second * 1000:.0f} ms per audio second")
+    with StandInServer(profile=LatencyProfile(0.3, per_second=per_second)) as server:
+        backend = OpenAICompatibleBackend("stand-in", base_url=f"{server.url}/v1", max_connections=workers)
+
+        start = time.perf_counter()
+        backend.transcribe(encode_audio(audio, rate, 'flac'), "long.flac")
+        print(f"  one upload          {time.perf_counter() - start:6.2f} s")
+
+        async def request(encoded, index, seconds):
+            result = await backend.atranscribe(encoded, f"chunk_{index}.flac", response_format='verbose_json',
+                                               timestamp_granularities=['word'], audio_seconds=seconds)
+            return result.response
+
+        start = time.perf_counter()
+        text, count = asyncio.run(transcribe_chunked(audio, rate, request, chunk_seconds, workers=workers))
+        print(f"  {count} chunks of ~{chunk_seconds:g} s {time.perf_counter() - start:6.2f} s"
+              f" ({len(text.split())} words stitched)")
+        backend.close()
+
+    # Stitching the overlap without timestamps
+    left = "so the first thing we do is open the settings and then"
+    right = "And then, choose the model from the list"
+    print(f"  merge_text: '{merge_text(left, right)}'")
+
+
+if __name__ == "__main__":
+    # Benchmark: python chunked_transcription.py [minutes]
+    import sys
+    benchmark(float(sys.argv[1]) if len(sys.argv) > 1 else 10)
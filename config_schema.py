@@ -13,8 +13,37 @@ DEFAULT_CONFIG = {
     
     "api": {
         "key": "",
-        "provider": "groq",
-        "model": "whisper-large-v3"
+        "provider": "groq",  # groq, openai (any OpenAI-compatible server) or stand-in (local fake)
+        "base_url": "",  # empty = the provider's default, e.g. http://localhost:8000/v1 for a local server
+        "model": "whisper-large-v3",
+        "retries": 3,  # retries on rate limits, 5xx and network errors
+        "hedge": False,  # send a duplicate request when one is slow (costs extra quota)
+        "hedge_delay": 0,  # seconds before the duplicate, 0 = observed p90 latency
+        "requests_per_minute": 20,  # free-tier quota, 0 = no limit
+        "audio_seconds_per_hour": 7200,  # free-tier quota, 0 = no limit
+        "stand_in": {  # response times of the stand-in provider, seconds
+            "base": 0.3,
+            "per_second": 0.02,  # per second of audio
+            "jitter": 0.2,
+            "slow_rate": 0.0,
+            "slow_latency": 2.0
+        },
+        "routes": [],  # {"max_seconds": N, "model": name} sends short clips to a faster model (a mode's
+                       # own "routes" replaces these); empty = turbo under 10 s (groq provider only)
+        "models": {},  # per model: latency "budget" (s) + "per_second" of audio, and the "fallback"
+                       # used while it is exceeded; empty = Groq's defaults (groq provider only)
+        "cache": {  # identical audio + mode settings are answered without an API call
+            "enabled": True,
+            "memory_entries": 64,
+            "disk": False,  # keep results in cache/ even with global.log_texts off (they hold the text)
+            "disk_mb": 50  # results kept in cache/, least recently used removed first
+        },
+        "spool": {  # failed segments are kept in spool/ and re-sent later
+            "enabled": True,
+            "drain_interval": 30,  # seconds between re-send attempts while the API is down
+            "batch": 4,  # segments re-sent at once
+            "max_attempts": 5  # for errors a retry cannot fix (then moved to spool/failed/)
+        }
     },
     
     "input": {
@@ -34,7 +63,25 @@ DEFAULT_CONFIG = {
     "recording": {
         "max_duration": 180,
         "min_duration": 0.5,
-        "sample_rate": 16000
+        "sample_rate": 16000,
+        "native_rate": True,  # open the mic at its own rate and resample in-process
+        "preroll": 0.4,  # seconds of audio before the hotkey press added to each recording
+        "upload_format": "flac",  # wav, flac or opus
+        "opus_bitrate": 24,  # kbps, only used for opus
+        "trim_silence": True,  # cut silence before upload
+        "max_pause": 1.5,  # seconds, longer pauses are shortened to this
+        "silence_pad": 0.3,  # seconds of silence kept at the edges
+        "split_window": 10,  # seconds before max_duration searched for a pause
+        "pipelined": False,  # transcribe finished phrases while still recording (needs trim_silence)
+        "phrase_pause": 0.6,  # seconds of silence that end a phrase
+        "phrase_min": 8,  # seconds of audio before a phrase is sent early
+        "segment_workers": 2,  # parallel segment uploads
+        "max_pending_segments": 8,  # segments in flight before recording waits
+        "chunk_long": True,  # transcribe long segments as parallel chunks
+        "chunk_min": 90,  # seconds, longer segments are chunked
+        "chunk_seconds": 60,  # target chunk length, cut at a pause
+        "chunk_overlap": 1.0,  # seconds of audio shared by neighbouring chunks
+        "chunk_workers": 4  # chunks in flight at once
     },
     
     "modes": {
@@ -45,6 +92,7 @@ DEFAULT_CONFIG = {
                 "description": "Промпты для Claude, GPT, Gemini",
                 "prompt": "Формулировка промпта для AI ассистента. Русский язык, английские технические термины допустимы.",
                 "censor": False,
+                "speedup": 1.0,  # >1.0 speeds speech up before upload (e.g. 1.25)
                 "cleanup": True
             },
             "code": {
@@ -52,13 +100,21 @@ DEFAULT_CONFIG = {
                 "description": "Программирование и архитектура",
                 "prompt": "Программирование, Python, JavaScript, API, Docker, Git. Технический контекст, русский с английскими терминами.",
                 "censor": False,
-                "cleanup": True
+                "speedup": 1.0,  # >1.0 speeds speech up before upload (e.g. 1.25)
+                "cleanup": True,
+                "vocabulary": {  # spoken form → term, replaced as whole words after cleanup
+                    "докер": "Docker",
+                    "гит хаб": "GitHub",
+                    "пайтон": "Python"
+                },
+                "vocabulary_file": ""  # more terms, one "spoken, other spoken = Term" per line
             },
             "docs": {
                 "name": "📋 Docs",
                 "description": "Документация и спецификации",
                 "prompt": "Техническая документация, ТЗ, спецификации. Формальный русский язык.",
                 "censor": False,
+                "speedup": 1.0,  # >1.0 speeds speech up before upload (e.g. 1.25)
                 "cleanup": True
             },
             "notes": {
@@ -66,6 +122,7 @@ DEFAULT_CONFIG = {
                 "description": "Заметки для Obsidian, NotebookLM",
                 "prompt": "Заметки, мысли, идеи. Структурировать по пунктам если уместно.",
                 "censor": False,
+                "speedup": 1.0,  # >1.0 speeds speech up before upload (e.g. 1.25)
                 "cleanup": True
             },
             "empty": {
@@ -73,6 +130,7 @@ DEFAULT_CONFIG = {
                 "description": "Пустой шаблон для своего",
                 "prompt": "",
                 "censor": False,
+                "speedup": 1.0,  # >1.0 speeds speech up before upload (e.g. 1.25)
                 "cleanup": False
             }
         }
@@ -98,6 +156,27 @@ DEFAULT_CONFIG = {
         ]
     },
     
+    "output": {
+        "sink": "paste",  # paste (clipboard + Ctrl+V), type (keystrokes), stdout, file or none
+        "type_max_chars": 200,  # type sink: longer texts are pasted
+        "paste_timeout": 0.5,  # seconds to wait for the clipboard to hold the text
+        "file": "transcripts.txt"  # file sink, relative to script dir
+    },
+    
+    "events": {  # JSON lines for other apps: recording started/stopped, segment and final text, timings
+        "enabled": False,
+        "host": "127.0.0.1",  # localhost only
+        "port": 8766,  # next to 8765, where stand_in_server.py listens by default
+        "unix_socket": "",  # path: listen on a Unix-domain socket instead of the port
+        "buffer": 256  # events queued per subscriber, a slow one loses its oldest
+    },
+    
+    "profanity": {
+        "languages": ["ru"],  # built-in root lists: ru, en (a mode's profanity_languages overrides)
+        "roots": [],  # extra roots for every language, a word starting with one is censored
+        "directory": "profanity"  # <lang>.txt here adds roots (one per line), relative to script dir
+    },
+    
     "language": {
         "primary": "ru",
         "allow_english": True
@@ -0,0 +1,286 @@
+"""
+VoiceGrab Core Pipeline
+asyncio event loop that runs segments through bounded stage queues
+"""
+
+import asyncio
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class Job:
+    """One segment on its way through the pipeline; stages add attributes as they go"""
+
+    def __init__(self, session, **fields):
+        self.session = session
+        self.seq = None  # delivery order, None for jobs started with run()
+        self.cancelled = False
+        self.created = time.perf_counter()
+        self.timings = {}  # stage name -> seconds
+        self.done = None  # asyncio.Future with the job (or None if dropped)
+        self.task = None  # the stage call currently working on the job
+        self.holds_slot = False
+        self.__dict__.update(fields)
+
+
+class CorePipeline:
+    """Event-loop thread that owns the recording state and the segment pipeline.
+
+    Other threads (hotkey listener, tray, indicator) never touch that
+    state: `post()` hands a command to the loop, and commands run one at a
+    time in arrival order, so start, split and stop cannot interleave.
+    `interrupt()` runs a function on the loop right away, ahead of queued
+    commands (ESC).
+
+    Jobs flow through `stages`, a list of (name, fn) connected by bounded
+    queues and served by `workers` tasks each. Coroutine stages (uploads)
+    run on the loop; plain functions (encoding, cleanup) run in a thread
+    pool so they never block it. A stage that returns None drops the job.
+    At most `max_pending` jobs are in flight: `submit()` waits for a slot,
+    `queue()` returns at once and lets the job wait for one in the
+    background, so a command is never held up by a busy pipeline.
+    An express job (the final segment) skips the stage queues and runs
+    through the stages in its own task, so it is never stuck behind
+    background jobs holding every worker (e.g. waiting for rate-limit
+    quota). Submitted jobs reach `deliver` strictly in order, on one
+    output thread (clipboard and paste block).
+    """
+
+    def __init__(self, stages, deliver, workers=2, max_pending=8):
+        self._stages = stages
+        self._deliver = deliver
+        self.workers = workers
+        self.max_pending = max_pending
+        self.loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=workers + 1, thread_name_prefix="core-stage")
+        self._output = ThreadPoolExecutor(max_workers=1, thread_name_prefix="core-output")
+        self._ready = threading.Event()
+
+        # Owned by the loop thread
+        self.session = 0
+        self._next_seq = 0
+        self._next_delivery = 0
+        self._finished = {}  # seq -> job waiting for earlier ones
+        self._jobs = set()  # jobs not yet delivered or finished
+        self._background = set()  # fire-and-forget tasks (see spawn)
+
+    # --- Thread-safe handoff ---
+
+    def start(self):
+        """Start the loop thread and its stage workers"""
+        threading.Thread(target=self._run, name="voicegrab-core", daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._setup())
+        self._ready.set()
+        self.loop.run_forever()
+
+    def post(self, fn, *args):
+        """Queue fn(*args) (function or coroutine function) as the next command"""
+        future = Future()
+        self.loop.call_soon_threadsafe(self._commands.put_nowait, (fn, args, future))
+        return future
+
+    def interrupt(self, fn, *args):
+        """Run fn(*args) on the loop now, ahead of queued commands"""
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    # --- On the loop ---
+
+    async def _setup(self):
+        self._commands = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._queues = [asyncio.Queue(self.max_pending) for _ in self._stages]
+        self._outbox = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._command_loop()), asyncio.create_task(self._output_loop())]
+        for index in range(len(self._stages)):
+            for _ in range(self.workers):
+                self._tasks.append(asyncio.create_task(self._stage_worker(index)))
+
+    async def command(self, fn, *args):
+        """From a task on the loop: queue a command and wait for it to run"""
+        return await asyncio.wrap_future(self.post(fn, *args))
+
+    def spawn(self, coro):
+        """Run a coroutine in the background, keeping a reference until it ends"""
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    def to_thread(self, fn, *args):
+        """Await fn(*args) on the stage thread pool"""
+        return self.loop.run_in_executor(self._executor, fn, *args)
+
+    async def _command_loop(self):
+        while True:
+            fn, args, future = await self._commands.get()
+            try:
+                result = fn(*args)
+                if asyncio.iscoroutine(result):
+                    result = await result
+                future.set_result(result)
+            except Exception as e:
+                print(f"[ERROR] {getattr(fn, '__name__', fn)} crashed: {e}")
+                traceback.print_exc()
+                future.set_exception(e)
+
+    # --- Sessions ---
+
+    def new_session(self):
+        """Start a new recording session"""
+        self.session += 1
+        return self.session
+
+    def cancel_session(self):
+        """Drop every job of the current session not yet delivered (ESC).
+
+        The stage each job is in is cancelled, which aborts its upload;
+        thread-pool stages finish in the background and are discarded.
+        Returns the number of jobs dropped.
+        """
+        dropped = [job for job in self._jobs if job.session == self.session and not job.cancelled]
+        for job in dropped:
+            job.cancelled = True
+            if job.task is not None:
+                job.task.cancel()
+        self.session += 1
+        return len(dropped)
+
+    def pending(self):
+        """Jobs of any session not yet delivered or finished"""
+        return len(self._jobs)
+
+    # --- Jobs ---
+
+    async def submit(self, job, slot=True, express=False):
+        """Queue a job whose result is delivered in order; returns job.done.
+
+        With slot=False the job does not count against max_pending, with
+        express=True it does not wait for a stage worker either (the final
+        segment must never wait behind background ones).
+        """
+        return await self._enqueue(job, ordered=True, slot=slot, express=express)
+
+    async def run(self, job):
+        """Queue a job that is not delivered; await job.done for its result"""
+        return await self._enqueue(job, ordered=False, slot=True)
+
+    def queue(self, job, ordered=True):
+        """submit() (or run() with ordered=False) that returns job.done right away.
+
+        Call on the loop. The job takes its place in delivery order now and
+        waits for a slot in its own task, so a command that produces jobs
+        (auto-segmentation) never stalls the commands queued behind it.
+        """
+        self._admit(job, ordered)
+        self.spawn(self._enter(job, slot=True))
+        return job.done
+
+    async def _enqueue(self, job, ordered, slot, express=False):
+        self._admit(job, ordered)
+        await self._enter(job, slot, express)
+        return job.done
+
+    def _admit(self, job, ordered):
+        job.done = self.loop.create_future()
+        # Cut before an ESC that ended its session: dropped once it has a slot.
+        # From here on only cancel_session() drops it, a new recording does not
+        job.cancelled = job.cancelled or job.session != self.session
+        if ordered:
+            job.seq = self._next_seq
+            self._next_seq += 1
+        self._jobs.add(job)
+
+    async def _enter(self, job, slot, express=False):
+        if slot:
+            if self._slots.locked():
+                print(f"⏳ {self.max_pending} segments in flight, waiting...")
+            await self._slots.acquire()
+            job.holds_slot = True
+        if job.cancelled:
+            self._finish(job, None)  # cancelled before it got queued
+        elif express:
+            self.spawn(self._express(job))
+        else:
+            await self._queues[0].put(job)
+
+    def _release(self, job):
+        if job.holds_slot:
+            job.holds_slot = False
+            self._slots.release()
+
+    async def _run_stage(self, index, job):
+        """One stage call for job; returns its result (None drops the job)"""
+        if job.cancelled:
+            return None
+        name, fn = self._stages[index]
+        start = time.perf_counter()
+        job.task = asyncio.ensure_future(fn(job)) if asyncio.iscoroutinefunction(fn) else self.to_thread(fn, job)
+        result = None
+        try:
+            result = await job.task
+        except asyncio.CancelledError:
+            if not job.cancelled:
+                raise  # the worker itself is being stopped
+        except Exception as e:
+            print(f"Error in {name} stage: {e}")
+        job.task = None
+        job.timings[name] = time.perf_counter() - start
+        return result
+
+    async def _express(self, job):
+        """All stages for one job in its own task, no stage queues"""
+        for index in range(len(self._stages)):
+            if await self._run_stage(index, job) is None or job.cancelled:
+                self._finish(job, None)
+                return
+        self._finish(job, job)
+
+    async def _stage_worker(self, index):
+        inbox = self._queues[index]
+        while True:
+            job = await inbox.get()
+            result = await self._run_stage(index, job)
+            if result is None or job.cancelled:
+                self._finish(job, None)
+            elif index + 1 < len(self._queues):
+                await self._queues[index + 1].put(job)
+            else:
+                self._finish(job, job)
+
+    def _finish(self, job, result):
+        if job.seq is None:
+            # run(): hand the result to whoever awaits job.done
+            self._jobs.discard(job)
+            self._release(job)
+            if not job.done.done():
+                job.done.set_result(None if job.cancelled else result)
+            return
+        job.result = result
+        self._finished[job.seq] = job
+        self._outbox.set()
+
+    async def _output_loop(self):
+        while True:
+            await self._outbox.wait()
+            self._outbox.clear()
+            while self._next_delivery in self._finished:
+                job = self._finished.pop(self._next_delivery)
+                self._next_delivery += 1
+                self._jobs.discard(job)
+                self._release(job)
+                result = None if job.cancelled else job.result
+                if not job.done.done():
+                    job.done.set_result(result)
+                if result is None:
+                    continue
+                try:
+                    await self.loop.run_in_executor(self._output, self._deliver, result)
+                except Exception as e:
+                    print(f"Error delivering segment {job.seq}: {e}")
@@ -0,0 +1,202 @@
+"""
+VoiceGrab Event Server
+Local socket that streams recording and transcript events as JSON lines
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+
+class _Subscriber:
+    """One connected client: its bounded queue and how many events it missed"""
+
+    def __init__(self, writer, buffer):
+        self.writer = writer
+        self.queue = asyncio.Queue(buffer)
+        self.dropped = 0
+        self.tasks = ()  # (connection, sender)
+
+
+class EventServer:
+    """Publishes events to every connected client, one JSON object per line.
+
+    Listens on `host`:`port` (localhost only by default) or, with `path`,
+    on a Unix-domain socket. Clients only read; each line looks like
+    {"event": "final", "time": 1700000000.123, "text": ..., ...} and the
+    first one is {"event": "hello", ...}.
+
+    The server has its own event-loop thread, and `publish()` only hands
+    the encoded line over to it, so it is safe from any thread and never
+    blocks. Each subscriber has a queue of `buffer` events: a client that
+    reads too slowly loses its oldest events (it is told how many with a
+    "dropped" event) instead of holding up the pipeline or other clients.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8766, path=None, buffer=256):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.buffer = buffer
+        self.loop = asyncio.new_event_loop()
+        self._subscribers = set()
+        self._server = None
+        self._ready = threading.Event()
+        self._error = None
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def address(self):
+        if self.path:
+            return str(self.path)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"{host}:{port}"
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def start(self):
+        """Start the server thread; raises OSError if the address is taken"""
+        threading.Thread(target=self._run, name="voicegrab-events", daemon=True).start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            if self.path:
+                start = asyncio.start_unix_server(self._serve, str(self.path))
+            else:
+                start = asyncio.start_server(self._serve, self.host, self.port)
+            self._server = self.loop.run_until_complete(start)
+        except (OSError, NotImplementedError, AttributeError) as e:
+            self._error = e if isinstance(e, OSError) else OSError(f"Unix sockets not supported here ({e})")
+            self._ready.set()
+            return
+        self._ready.set()
+        self.loop.run_forever()
+
+    def stop(self):
+        """Disconnect every subscriber and stop the server thread"""
+        if self._server:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def publish(self, event, **fields):
+        """Send {"event": event, "time": ..., **fields} to every subscriber (any thread)"""
+        if not self._subscribers:
+            return  # nobody listening: not even the JSON is built
+        line = json.dumps({'event': event, 'time': round(time.time(), 3), **fields}, ensure_ascii=False)
+        self.loop.call_soon_threadsafe(self._fanout, (line + "\n").encode('utf-8'))
+
+    # --- On the server loop ---
+
+    async def _shutdown(self):
+        self._server.close()
+        connections = [subscriber.tasks[0] for subscriber in self._subscribers if subscriber.tasks]
+        for subscriber in list(self._subscribers):
+            subscriber.writer.close()  # the connection task sees EOF and cleans up
+        if connections:
+            await asyncio.wait(connections, timeout=2)
+
+    def _fanout(self, line):
+        self.published += 1
+        for subscriber in self._subscribers:
+            if subscriber.queue.full():
+                subscriber.queue.get_nowait()  # too slow: drop its oldest event
+                subscriber.dropped += 1
+                self.dropped += 1
+            subscriber.queue.put_nowait(line)
+
+    async def _send(self, subscriber):
+        writer = subscriber.writer
+        while True:
+            line = await subscriber.queue.get()
+            if subscriber.dropped:
+                missed = json.dumps({'event': 'dropped', 'time': round(time.time(), 3), 'count': subscriber.dropped})
+                subscriber.dropped = 0
+                writer.write((missed + "\n").encode('utf-8'))
+            writer.write(line)
+            await writer.drain()  # only this client's task waits
+
+    async def _serve(self, reader, writer):
+        subscriber = _Subscriber(writer, self.buffer)
+        hello = json.dumps({'event': 'hello', 'time': round(time.time(), 3), 'buffer': self.buffer})
+        subscriber.queue.put_nowait((hello + "\n").encode('utf-8'))
+        self._subscribers.add(subscriber)
+        sender = asyncio.ensure_future(self._send(subscriber))
+        subscriber.tasks = (asyncio.current_task(), sender)
+        try:
+            # Clients do not send anything; reading just notices when they leave
+            while not sender.done() and await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self._subscribers.discard(subscriber)
+            sender.cancel()
+            writer.close()
+
+
+def watch(host='127.0.0.1', port=8766):
+    """Print the events of a running VoiceGrab"""
+    import socket
+    with socket.create_connection((host, port)) as connection:
+        for line in connection.makefile('r', encoding='utf-8'):
+            print(line.rstrip())
+
+
+def benchmark(events=20000, buffer=256):
+    """publish() cost with a fast and a stalled subscriber connected"""
+    import socket
+
+    server = EventServer(port=0, buffer=buffer).start()
+    host, port = server.address.rsplit(':', 1)
+    fast = socket.create_connection((host, int(port)))
+    stalled = socket.create_connection((host, int(port)))
+    stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)  # and never read
+    while server.subscribers < 2:
+        time.sleep(0.01)
+
+    received = []
+
+    def read():
+        for line in fast.makefile('r', encoding='utf-8'):
+            received.append(json.loads(line))
+            if received[-1].get('index') == events - 1:
+                break
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    text = "Нужно сделать рефакторинг модуля и потом задеплоить в Docker container."
+    start = time.perf_counter()
+    for index in range(events):
+        server.publish('segment', index=index, text=text, timings={'transcribe': 0.4})
+        if index % 256 == 255:
+            time.sleep(0.001)  # about as bursty as many segments at once gets
+    publish = time.perf_counter() - start
+    reader.join(30)
+    segments = sum(event['event'] == 'segment' for event in received)
+    missed = sum(event.get('count', 0) for event in received if event['event'] == 'dropped')
+    print(f"{events} events, buffer {buffer} per subscriber")
+    print(f"  publish: {publish / events * 1e6:.1f} µs per event (caller never waits for a client)")
+    print(f"  fast client got {segments} ({missed} dropped), stalled client dropped"
+          f" {server.dropped - missed} on the server side")
+    fast.close()
+    stalled.close()
+    server.stop()
+
+
+if __name__ == "__main__":
+    # Benchmark: python event_server.py
+    # Watch a running VoiceGrab: python event_server.py watch [port]
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == 'watch':
+        watch(port=int(sys.argv[2]) if len(sys.argv) > 2 else 8766)
+    else:
+        benchmark()
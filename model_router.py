@@ -0,0 +1,207 @@
+"""
+VoiceGrab Model Router
+Picks the Whisper model per clip by duration and observed latency
+"""
+
+import bisect
+import threading
+import time
+
+# Short clips to Groq's faster model, used only with the groq provider when
+# api.routes is empty (other servers may not serve it)
+GROQ_ROUTES = [{'max_seconds': 10, 'model': 'whisper-large-v3-turbo'}]
+
+# Latency budgets for Groq's Whisper models, used only with the groq provider
+# when api.models is empty (a self-hosted server may not serve the fallback)
+GROQ_MODELS = {
+    'whisper-large-v3': {'budget': 2.0, 'per_second': 0.03, 'fallback': 'whisper-large-v3-turbo'},
+    'whisper-large-v3-turbo': {'budget': 1.0, 'per_second': 0.015, 'fallback': 'whisper-large-v3'},
+}
+
+
+class LatencyHistogram:
+    """Request latencies of one model in fixed buckets, plus a moving average"""
+
+    BOUNDS = (0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0)  # seconds, upper bounds
+
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self.counts = [0] * (len(self.BOUNDS) + 1)  # last bucket: slower than every bound
+        self.average = None  # exponential moving average, seconds
+        self.excess = None  # same, minus the allowance for each request's audio length
+        self.total = 0.0
+        self.audio = 0.0  # seconds of audio sent
+        self.last_used = 0.0
+
+    def record(self, seconds, audio_seconds=0.0, per_second=0.0):
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.average = seconds if self.average is None else self.alpha * seconds + (1 - self.alpha) * self.average
+        excess = seconds - per_second * audio_seconds
+        self.excess = excess if self.excess is None else self.alpha * excess + (1 - self.alpha) * self.excess
+        self.total += seconds
+        self.audio += audio_seconds
+        self.last_used = time.monotonic()
+
+    @property
+    def requests(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (inf past the last bound)"""
+        target = q * self.requests
+        seen = 0
+        for bound, count in zip(self.BOUNDS + (float('inf'),), self.counts):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return 0.0
+
+    def summary(self):
+        if not self.requests:
+            return "no requests"
+        rtf = f", {self.total / self.audio:.2f}s per audio second" if self.audio else ""
+        return (f"{self.requests} requests, avg {self.average:.2f}s (moving), p50 ≤{self.quantile(0.5):g}s,"
+                f" p90 ≤{self.quantile(0.9):g}s{rtf}")
+
+    def buckets(self):
+        """'≤0.5s: 3' per non-empty bucket"""
+        labels = [f"≤{bound:g}s" for bound in self.BOUNDS] + [f">{self.BOUNDS[-1]:g}s"]
+        return ", ".join(f"{label}: {count}" for label, count in zip(labels, self.counts) if count)
+
+
+class ModelRouter:
+    """Chooses the model for each request.
+
+    `routes` is a list of {"max_seconds": N, "model": name}: the first
+    route whose max_seconds covers the clip wins, longer clips get the
+    mode's own model. `models` maps a model to {"budget": seconds,
+    "per_second": seconds, "fallback": other model}: while a model's
+    moving-average latency, less `per_second` for each second of audio
+    (so long clips are not held against it), is over its budget, requests
+    go to its fallback instead. After
+    `retry_after` seconds without requests the slow model is tried
+    again, so it can prove it has recovered. Every request's latency
+    lands in a per-model LatencyHistogram (`histograms`).
+    """
+
+    def __init__(self, routes=(), models=None, retry_after=60.0, alpha=0.2):
+        self.routes = sorted(routes, key=lambda route: route['max_seconds'])
+        self.models = models or {}
+        self.retry_after = retry_after
+        self.alpha = alpha
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._degraded = set()  # preferred models currently replaced by a fallback
+        self.fallbacks = 0
+
+    def histogram(self, model):
+        with self._lock:
+            if model not in self.histograms:
+                self.histograms[model] = LatencyHistogram(self.alpha)
+            return self.histograms[model]
+
+    def over_budget(self, model):
+        budget = self.models.get(model, {}).get('budget')
+        histogram = self.histograms.get(model)
+        if not budget or histogram is None or histogram.excess is None:
+            return False
+        if time.monotonic() - histogram.last_used > self.retry_after:
+            return False  # long unused: give it another chance
+        return histogram.excess > budget
+
+    def choose(self, default_model, audio_seconds, routes=None):
+        """Model for a clip of audio_seconds; routes overrides the router's own (per mode)"""
+        routes = self.routes if routes is None else sorted(routes, key=lambda route: route['max_seconds'])
+        model = next((route['model'] for route in routes if audio_seconds <= route['max_seconds']), default_model)
+        preferred, tried = model, [model]
+        while self.over_budget(model):
+            fallback = self.models.get(model, {}).get('fallback')
+            if not fallback or fallback in tried:
+                # Everything is slow: take the fastest of them
+                model = min(tried, key=lambda name: self.histograms[name].excess)
+                break
+            model = fallback
+            tried.append(model)
+        if model != preferred:
+            self.fallbacks += 1
+            if preferred not in self._degraded:
+                self._degraded.add(preferred)
+                print(f"🔀 {preferred} over its latency budget, using {model}")
+        elif preferred in self._degraded:
+            self._degraded.discard(preferred)
+            print(f"🔀 Back to {preferred}")
+        return model
+
+    def record(self, model, seconds, audio_seconds=0.0):
+        histogram = self.histogram(model)
+        per_second = self.models.get(model, {}).get('per_second', 0.0)
+        with self._lock:
+            histogram.record(seconds, audio_seconds, per_second)
+
+    def report(self):
+        """One line per model, for tuning routes and budgets"""
+        lines = []
+        for model, histogram in sorted(self.histograms.items()):
+            lines.append(f"{model}: {histogram.summary()}")
+            lines.append(f"    {histogram.buckets()}")
+        return lines
+
+
+def benchmark(clips=40, seed=1):
+    """Mixed clip lengths against a stand-in with per-model speeds: one model vs routed"""
+    import random
+    import statistics
+    from stand_in_server import StandInServer, LatencyProfile
+    from transcription_client import OpenAICompatibleBackend
+    from audio_encoder import encode_audio
+    import numpy as np
+
+    rng = random.Random(seed)
+    durations = [rng.choice((1.5, 2, 3, 4)) if rng.random() < 0.7 else rng.uniform(20, 60) for _ in range(clips)]
+    audio = {d: encode_audio(np.zeros(int(d * 16000), dtype=np.float32), 16000, 'flac') for d in set(durations)}
+    profiles = {
+        'whisper-large-v3': LatencyProfile(0.35, per_second=0.012, jitter=0.15, seed=seed),
+        'whisper-large-v3-turbo': LatencyProfile(0.12, per_second=0.006, jitter=0.15, seed=seed),
+    }
+    print(f"{clips} clips, {sum(d < 10 for d in durations)} under 10 s; stand-in latency per model:"
+          f" large-v3 0.35 s + 12 ms/s, turbo 0.12 s + 6 ms/s")
+
+    setups = (
+        ("large-v3 only", ModelRouter()),
+        ("turbo under 10 s", ModelRouter(GROQ_ROUTES)),
+    )
+    for label, router in setups:
+        with StandInServer(profiles=profiles) as server:
+            backend = OpenAICompatibleBackend("stand-in", base_url=f"{server.url}/v1")
+            short, long = [], []
+            for duration in durations:
+                model = router.choose('whisper-large-v3', duration)
+                result = backend.transcribe(audio[duration], "clip.flac", model=model)
+                router.record(model, result.timings['request'], duration)
+                (short if duration < 10 else long).append(result.timings['total'])
+            backend.close()
+        print(f"  {label:<18} short clips median {statistics.median(short) * 1000:5.0f} ms,"
+              f" long clips median {statistics.median(long) * 1000:5.0f} ms")
+        for line in router.report():
+            print(f"    {line}")
+
+    # Fallback: large-v3 turns slow half way through
+    router = ModelRouter(models={'whisper-large-v3': {'budget': 1.0, 'fallback': 'whisper-large-v3-turbo'}})
+    with StandInServer(profiles=profiles) as server:
+        backend = OpenAICompatibleBackend("stand-in", base_url=f"{server.url}/v1")
+        times = []
+        for index in range(20):
+            if index == 10:
+                profiles['whisper-large-v3'].slow_rate = 1.0  # every request 2 s slower from now on
+            model = router.choose('whisper-large-v3', 30)
+            result = backend.transcribe(audio[durations[0]], "clip.flac", model=model)
+            router.record(model, result.timings['request'], 30)
+            times.append(result.timings['total'])
+        backend.close()
+    print(f"  large-v3 slows down after 10 requests, budget 1 s: fell back {router.fallbacks} times,"
+          f" last 5 median {statistics.median(times[-5:]) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    # Benchmark: python model_router.py
+    benchmark()
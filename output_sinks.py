@@ -0,0 +1,206 @@
+"""
+VoiceGrab Output Sinks
+Where finished text goes: paste, typing, stdout, a file or nowhere
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+
+class OutputSink:
+    """Delivers text somewhere and keeps its own delivery latency.
+
+    `deliver()` returns the seconds one delivery took; `deliveries`,
+    `total` and `slowest` add up over the session (see `summary()`).
+    Subclasses implement `write()`.
+    """
+
+    name = 'sink'
+
+    def __init__(self):
+        self.deliveries = 0
+        self.total = 0.0
+        self.slowest = 0.0
+
+    def write(self, text):
+        raise NotImplementedError
+
+    def deliver(self, text):
+        start = time.perf_counter()
+        self.write(text)
+        seconds = time.perf_counter() - start
+        self.deliveries += 1
+        self.total += seconds
+        self.slowest = max(self.slowest, seconds)
+        return seconds
+
+    def summary(self):
+        if not self.deliveries:
+            return f"{self.name}: nothing delivered"
+        return (f"{self.name}: {self.deliveries} deliveries, avg {self.total / self.deliveries * 1000:.2f} ms,"
+                f" slowest {self.slowest * 1000:.2f} ms")
+
+    def close(self):
+        pass
+
+
+class NullSink(OutputSink):
+    """Drops the text (benchmarks, or when only the log is wanted)"""
+
+    name = 'none'
+
+    def write(self, text):
+        pass
+
+
+class StdoutSink(OutputSink):
+    """Prints the text on its own line, for piping VoiceGrab into other tools"""
+
+    name = 'stdout'
+
+    def __init__(self, stream=None):
+        super().__init__()
+        self.stream = stream
+
+    def write(self, text):
+        stream = self.stream or sys.stdout
+        stream.write(text + "\n")
+        stream.flush()
+
+
+class FileSink(OutputSink):
+    """Appends each text as a line to `path`, kept open between deliveries"""
+
+    name = 'file'
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = Path(path)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(text + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+class PasteSink(OutputSink):
+    """Copies the text to the clipboard and presses Ctrl+V.
+
+    Instead of sleeping a fixed 100 ms after the copy, the clipboard is
+    read back until it holds the text (at most `timeout` seconds), which
+    usually takes a millisecond or two. The keyboard controller is created
+    once and reused.
+    """
+
+    name = 'paste'
+
+    def __init__(self, timeout=0.5, poll=0.005):
+        super().__init__()
+        self.timeout = timeout
+        self.poll = poll
+        self._keyboard = None
+
+    def controller(self):
+        if self._keyboard is None:
+            # Use pynput Controller for Ctrl+V (no admin needed)
+            from pynput import keyboard
+            self._keyboard = keyboard.Controller()
+        return self._keyboard
+
+    def copy(self, text):
+        """Put text on the clipboard; returns False if it did not show up in time"""
+        import pyperclip
+        pyperclip.copy(text)
+        expected = text.replace('\r\n', '\n')
+        deadline = time.perf_counter() + self.timeout
+        while (pyperclip.paste() or '').replace('\r\n', '\n') != expected:
+            if time.perf_counter() > deadline:
+                return False
+            time.sleep(self.poll)
+        return True
+
+    def write(self, text):
+        from pynput import keyboard
+        if not self.copy(text):
+            print(f"⚠️ Clipboard not updated after {self.timeout:g}s, pasting anyway")
+        kb = self.controller()
+        kb.press(keyboard.Key.ctrl)
+        kb.press('v')
+        kb.release('v')
+        kb.release(keyboard.Key.ctrl)
+
+
+class TypeSink(PasteSink):
+    """Types short texts as keystrokes (clipboard untouched), pastes longer ones"""
+
+    name = 'type'
+
+    def __init__(self, max_chars=200, timeout=0.5):
+        super().__init__(timeout)
+        self.max_chars = max_chars
+
+    def write(self, text):
+        if len(text) > self.max_chars:
+            super().write(text)
+        else:
+            self.controller().type(text)
+
+
+SINKS = ('paste', 'type', 'stdout', 'file', 'none')
+
+
+def create_sink(name='paste', path=None, type_max_chars=200, paste_timeout=0.5):
+    """Sink for output.sink: paste, type, stdout, file (appends to path) or none"""
+    if name == 'paste':
+        return PasteSink(paste_timeout)
+    if name == 'type':
+        return TypeSink(type_max_chars, paste_timeout)
+    if name == 'stdout':
+        return StdoutSink()
+    if name == 'file':
+        return FileSink(path or "transcripts.txt")
+    if name == 'none':
+        return NullSink()
+    raise ValueError(f"Unknown output sink '{name}' (use {', '.join(SINKS)})")
+
+
+def benchmark(deliveries=50):
+    """Delivery latency per sink, next to the old fixed 100 ms sleep before Ctrl+V"""
+    import io
+    import tempfile
+
+    text = "Нужно сделать рефакторинг модуля и потом задеплоить в Docker container."
+    with tempfile.TemporaryDirectory() as tmp:
+        sinks = [NullSink(), StdoutSink(io.StringIO()), FileSink(Path(tmp) / "out.txt")]
+        try:
+            import pyperclip
+            pyperclip.paste()
+            paste = PasteSink()
+            paste.write = paste.copy  # clipboard only: no Ctrl+V into this terminal
+            sinks.append(paste)
+        except Exception as e:
+            print(f"Clipboard not available ({e.__class__.__name__}), skipping paste")
+        for sink in sinks:
+            for index in range(deliveries):
+                sink.deliver(f"{text} {index}")
+            sink.close()
+            print(f"  {sink.summary()}")
+    print("  old paste: 100 ms sleep + a new keyboard controller per delivery")
+
+
+if __name__ == "__main__":
+    # Benchmark: python output_sinks.py
+    benchmark()
@@ -0,0 +1,192 @@
+"""
+VoiceGrab Profanity Filter
+Word roots per language censored in one compiled pass, look-alike letters folded first
+"""
+
+import os
+import re
+from pathlib import Path
+
+from text_cleanup import as_list, trie_pattern
+
+# Latin letters people (and Whisper) put in place of Cyrillic ones: look-alikes
+# (x → х, c → с) and transliterations (p → п, z → з). Folded one for one, so
+# a match in the folded text is at the same position in the original.
+_FOLD = str.maketrans('xyeacopkbiuzdlёXYEACOPKBIUZDLЁ', 'хуеасопкбииздлеХУЕАСОПКБИИЗДЛЕ')
+
+# Built-in roots; a file <lang>.txt in the roots directory adds to them
+ROOTS = {
+    'ru': ["хуй", "хуе", "хуя", "хуи", "пизд", "бля", "еб", "сук",
+           "дерьм", "мудак", "пидор", "хер", "жоп"],
+    'en': ["fuck", "motherfuck", "shit", "bitch", "cunt", "asshole"],
+}
+
+
+def fold(text):
+    """text with look-alike Latin letters (and ё) replaced by Cyrillic ones"""
+    return text.translate(_FOLD)
+
+
+def load_roots(path):
+    """Roots from a file: one or more per line (comma-separated), `#` starts a comment"""
+    roots = []
+    for line in Path(path).read_text(encoding='utf-8-sig').splitlines():
+        roots += as_list(line.split('#', 1)[0])
+    return roots
+
+
+class ProfanityFilter:
+    """Censors every word that starts with one of `roots`.
+
+    Roots and text are folded the same way, so "xуй" (Latin x) and "хуй"
+    hit the same root. All roots share one trie regex anchored at word
+    starts, so a transcript is scanned once and the cost hardly changes
+    between ten roots and hundreds.
+    """
+
+    def __init__(self, roots, mask='***'):
+        self.roots = sorted({fold(root.strip().lower()) for root in roots if root.strip()})
+        self.mask = mask
+        pattern = trie_pattern(self.roots)
+        self.pattern = re.compile(rf'(?<!\w)(?:{pattern})\w*', re.IGNORECASE) if pattern else None
+
+    def censor(self, text):
+        if not self.pattern:
+            return text
+        folded = fold(text)
+        parts, position = [], 0
+        for match in self.pattern.finditer(folded):
+            parts += [text[position:match.start()], self.mask]
+            position = match.end()
+        if not parts:
+            return text
+        parts.append(text[position:])
+        return ''.join(parts)
+
+
+class ProfanityCensor:
+    """ProfanityFilter per mode, built on first use.
+
+    A mode's `profanity_languages` (default: `languages`) picks the root
+    lists: the built-in ROOTS plus `<directory>/<lang>.txt` when it
+    exists, so a language without built-in roots only needs its file.
+    `roots` and the mode's `profanity_roots` are added on top. Filters are
+    cached per mode with the root files they were built from: `refresh()`
+    drops those whose files changed, `invalidate()` all of them (the mode
+    settings changed), so a transcript itself costs no file checks.
+    """
+
+    def __init__(self, modes, directory=None, languages=('ru',), roots=()):
+        self.modes = modes
+        self.directory = Path(directory) if directory else None
+        self.languages = as_list(languages)
+        self.roots = as_list(roots)
+        self._filters = {}  # mode -> (root files with mtimes, ProfanityFilter)
+        self.compiled = 0
+
+    def _file(self, language):
+        if not self.directory:
+            return None, None
+        path = self.directory / f"{language}.txt"
+        try:
+            return path, os.stat(path).st_mtime
+        except OSError:
+            return None, None
+
+    def _settings(self, mode_data):
+        languages = tuple(as_list(mode_data.get('profanity_languages') or self.languages))
+        roots = tuple(self.roots + as_list(mode_data.get('profanity_roots', [])))
+        return languages, roots, tuple(self._file(language) for language in languages)
+
+    def _build(self, languages, roots, files):
+        all_roots = list(roots)
+        for language, (path, _) in zip(languages, files):
+            all_roots += ROOTS.get(language, [])
+            if path:
+                try:
+                    all_roots += load_roots(path)
+                except OSError as e:
+                    print(f"⚠️ Profanity roots {path.name}: {e}")
+            elif language not in ROOTS:
+                print(f"⚠️ No profanity roots for '{language}'")
+        return ProfanityFilter(all_roots)
+
+    def filter(self, mode_key):
+        cached = self._filters.get(mode_key)
+        if cached is None:
+            languages, roots, files = self._settings(self.modes.get(mode_key, {}))
+            cached = (tuple(zip(languages, files)), self._build(languages, roots, files))
+            self._filters[mode_key] = cached
+            self.compiled += 1
+        return cached[1]
+
+    def refresh(self):
+        """Drop the filters of modes whose root files changed (or appeared) since they were built"""
+        for mode_key, (files, _) in list(self._filters.items()):
+            if any(self._file(language) != file for language, file in files):
+                del self._filters[mode_key]
+
+    def invalidate(self):
+        """Drop all filters (the mode settings changed)"""
+        self._filters.clear()
+
+    def censor(self, text, mode_key):
+        """Replace offensive words with ***"""
+        return self.filter(mode_key).censor(text)
+
+
+def _reference_filter(text):
+    """The previous implementation: ten hard-coded regexes, one after another"""
+    profanity_patterns = [
+        r'\b[хx][уy][йеёия]\w*', r'\b[пp][иiu][зz][дd]\w*', r'\b[бb][лl][яa]\w*',
+        r'\b[еe][бb]\w*', r'\b[сc][уy][кk]\w*', r'\bдерьм\w*', r'\bмудак\w*',
+        r'\bпидор\w*', r'\bхер\w*', r'\bжоп\w*'
+    ]
+    for pattern in profanity_patterns:
+        text = re.sub(pattern, '***', text, flags=re.IGNORECASE)
+    return text
+
+
+def benchmark(counts=(len(ROOTS['ru']), 100, 500), words=2000, repeats=20):
+    """Regex per root vs one compiled filter, as the root list grows"""
+    import random
+    import time
+
+    rng = random.Random(1)
+    letters = 'абвгдежзиклмнопрстуфхцчшщэюя'
+    vocabulary = ("нужно", "поднять", "докер", "и", "залить", "на", "гит", "хаб", "скрипт", "потом",
+                  "проверить", "сука", "блять", "xуйня", "Пиздец", "херня", "ebaть")
+    text = ' '.join(rng.choice(vocabulary) for _ in range(words))
+
+    # Same result as the hard-coded patterns for the built-in Russian roots
+    assert ProfanityFilter(ROOTS['ru']).censor(text) == _reference_filter(text)
+
+    print(f"{words}-word transcript")
+    for count in counts:
+        roots = ROOTS['ru'] + [''.join(rng.choice(letters) for _ in range(rng.randint(3, 6)))
+                               for _ in range(count - len(ROOTS['ru']))]
+        start = time.perf_counter()
+        profanity = ProfanityFilter(roots)
+        built = (time.perf_counter() - start) * 1000
+        patterns = [re.compile(rf'\b{re.escape(root)}\w*', re.IGNORECASE) for root in profanity.roots]
+
+        def per_root():
+            result = fold(text)
+            for pattern in patterns:
+                result = pattern.sub('***', result)
+            return result
+
+        timings = []
+        for censor in (per_root, lambda: profanity.censor(text)):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                censor()
+            timings.append((time.perf_counter() - start) / repeats * 1000)
+        print(f"  {count:>4} roots: regex per root {timings[0]:7.2f} ms, compiled {timings[1]:5.2f} ms"
+              f" (built in {built:.1f} ms)")
+    print(f"  '{ProfanityFilter(ROOTS['ru']).censor('Ну xуйня какая-то, сука, опять Пиздец')}'")
+
+
+if __name__ == "__main__":
+    # Benchmark: python profanity_filter.py
+    benchmark()
@@ -0,0 +1,179 @@
+"""
+VoiceGrab Rate Limiter
+Token buckets for requests/minute and audio-seconds/hour with priorities
+"""
+
+import asyncio
+import heapq
+import itertools
+import re
+import threading
+import time
+
+
+FINAL = 0  # the stop segment the user is waiting for
+BACKGROUND = 1  # auto-split segments and pipelined phrases
+
+_DURATION = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_reset(value):
+    """Seconds from a reset header ('7.66s', '2m59.56s', '120ms' or plain seconds)"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _UNITS[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """`capacity` tokens, refilled continuously over `period` seconds"""
+
+    def __init__(self, capacity, period):
+        self.capacity = float(capacity)
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # server said the quota is used up until then
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` tokens are available (0 if now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # one huge request must not wait forever
+        refill = (amount - self.tokens) / self.rate if self.tokens < amount else 0.0
+        return max(refill, self.blocked_until - now)
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.tokens -= amount
+
+    def sync(self, remaining, reset, now):
+        """Trust the server: never assume more tokens than it reports left"""
+        self._refill(now)
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+            if remaining < 1 and reset:
+                self.blocked_until = max(self.blocked_until, now + reset)
+
+
+class RateLimiter:
+    """Scheduler that delays requests until both quotas allow them.
+
+    Every request takes one request token and its audio seconds (at least
+    `min_audio`, the shortest duration the API bills). Callers wait in
+    priority order, FINAL before BACKGROUND and first come first served
+    within a priority, so the stop segment jumps the queue of auto-split
+    segments. `x-ratelimit-remaining-*` / `x-ratelimit-reset-*` response
+    headers and 429 Retry-After correct the local estimate.
+    """
+
+    def __init__(self, requests_per_minute=20, audio_seconds_per_hour=7200, min_audio=10.0):
+        self.requests = TokenBucket(requests_per_minute, 60) if requests_per_minute else None
+        self.audio = TokenBucket(audio_seconds_per_hour, 3600) if audio_seconds_per_hour else None
+        self.min_audio = min_audio
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (priority, order)
+        self._order = itertools.count()
+        self.waited = 0.0  # total seconds spent waiting for quota
+
+    def _buckets(self, audio_seconds):
+        cost = max(audio_seconds, self.min_audio)
+        return [(bucket, amount) for bucket, amount in ((self.requests, 1), (self.audio, cost)) if bucket]
+
+    def _try_take(self, ticket, needs, start):
+        """With the lock held: take the quota if ticket is first and it is available.
+
+        Returns None when taken, otherwise the seconds to wait (0 = not first yet).
+        """
+        if self._queue[0] != ticket:
+            return 0.0
+        now = time.monotonic()
+        wait = max((bucket.wait_time(amount, now) for bucket, amount in needs), default=0.0)
+        if wait > 0:
+            return wait
+        heapq.heappop(self._queue)
+        for bucket, amount in needs:
+            bucket.take(amount, now)
+        self.waited += now - start
+        self._cond.notify_all()
+        return None
+
+    def _enqueue(self, priority):
+        ticket = (priority, next(self._order))
+        heapq.heappush(self._queue, ticket)
+        self._cond.notify_all()  # a higher priority may now be first
+        return ticket
+
+    def acquire(self, audio_seconds, priority=BACKGROUND):
+        """Block until the request may be sent, returns the seconds waited"""
+        needs = self._buckets(audio_seconds)
+        start = time.monotonic()
+        announced = False
+        with self._cond:
+            ticket = self._enqueue(priority)
+            while (wait := self._try_take(ticket, needs, start)) is not None:
+                if wait and not announced:
+                    print(f"⏳ Rate limit: waiting {wait:.1f}s")
+                    announced = True
+                self._cond.wait(timeout=wait or None)
+        return time.monotonic() - start
+
+    async def acquire_async(self, audio_seconds, priority=BACKGROUND, poll=0.05):
+        """acquire() for the event loop: waits without blocking it, and can be cancelled"""
+        needs = self._buckets(audio_seconds)
+        start = time.monotonic()
+        announced = False
+        with self._cond:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_take(ticket, needs, start)
+                if wait is None:
+                    return time.monotonic() - start
+                if wait and not announced:
+                    print(f"⏳ Rate limit: waiting {wait:.1f}s")
+                    announced = True
+                await asyncio.sleep(min(wait, 1.0) if wait else poll)
+        except asyncio.CancelledError:
+            with self._cond:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+            raise
+
+    def update(self, headers, status=None):
+        """Apply rate-limit headers from a response (and a 429's Retry-After)"""
+        now = time.monotonic()
+        with self._cond:
+            for name, value in headers.items():
+                name = name.lower()
+                if not name.startswith('x-ratelimit-remaining-'):
+                    continue
+                kind = name[len('x-ratelimit-remaining-'):]
+                bucket = self.requests if kind == 'requests' else self.audio if 'audio' in kind else None
+                if bucket is None:
+                    continue  # token limits do not apply to transcription
+                try:
+                    remaining = float(value)
+                except ValueError:
+                    continue
+                bucket.sync(remaining, parse_reset(headers.get(f'x-ratelimit-reset-{kind}')), now)
+
+            if status == 429:
+                retry = parse_reset(headers.get('retry-after')) or 1.0
+                for bucket in (self.requests, self.audio):
+                    if bucket:
+                        bucket.blocked_until = max(bucket.blocked_until, now + retry)
+            self._cond.notify_all()
@@ -0,0 +1,237 @@
+"""
+VoiceGrab Request Policy
+Jittered exponential-backoff retries and hedged requests for API calls
+"""
+
+import asyncio
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+import groq
+import httpx
+
+
+RETRYABLE_STATUS = (408, 409, 429)  # plus every 5xx
+
+
+def is_retryable(error):
+    """Rate limits, server errors, timeouts and dropped connections"""
+    if isinstance(error, (groq.APIConnectionError, httpx.TransportError)):
+        return True
+    status = getattr(error, 'status_code', None)
+    return status is not None and (status in RETRYABLE_STATUS or status >= 500)
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait (Retry-After), or None"""
+    response = getattr(error, 'response', None)
+    value = response.headers.get('retry-after') if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RequestPolicy:
+    """Retries and optional hedging around a blocking request function.
+
+    Retryable failures are retried up to `retries` times after a full-jitter
+    exponential backoff (random between 0 and backoff * 2^attempt, capped
+    at `max_backoff`), or after the server's Retry-After if that is longer.
+
+    With `hedge` on, a request still running after `hedge_delay` seconds
+    (0 = the observed `hedge_quantile` latency) gets a duplicate, and the
+    first successful response wins. The losing request is billed too (the
+    async version cancels it, the threaded one lets it finish), which is
+    why hedging is off by default.
+    """
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=8.0, hedge=False, hedge_delay=0.0,
+                 hedge_quantile=0.9, history=50, min_samples=10):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=history)  # seconds of recent successful requests
+
+        self._lock = threading.Lock()
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def _bump(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def hedge_after(self):
+        """Seconds before a duplicate is sent, None if not hedging (yet)"""
+        if not self.hedge:
+            return None
+        if self.hedge_delay:
+            return self.hedge_delay
+        if len(self.latencies) < self.min_samples:
+            return None
+        return statistics.quantiles(self.latencies, n=100)[int(self.hedge_quantile * 100) - 1]
+
+    def backoff_delay(self, attempt, error=None):
+        """Full-jitter backoff, never shorter than the server's Retry-After"""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        server = retry_after(error)
+        return max(delay, server) if server else delay
+
+    def call(self, fn):
+        """Run fn() under the policy, returns its result or raises the last error"""
+        attempt = 0
+        while True:
+            try:
+                return self._hedged(fn)
+            except Exception as e:
+                if attempt >= self.retries or not is_retryable(e):
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                attempt += 1
+                self._bump('retried')
+                print(f"🔁 {type(e).__name__}, retry {attempt}/{self.retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _timed(self, fn):
+        start = time.perf_counter()
+        result = fn()
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+    def _spawn(self, fn):
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self._timed(fn))
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    def _hedged(self, fn):
+        delay = self.hedge_after()
+        if delay is None:
+            return self._timed(fn)
+
+        first = self._spawn(fn)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        self._bump('hedged')
+        second = self._spawn(fn)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._bump('hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    # --- asyncio ---
+
+    async def acall(self, fn):
+        """call() for coroutines: fn() returns an awaitable"""
+        attempt = 0
+        while True:
+            try:
+                return await self._ahedged(fn)
+            except Exception as e:
+                if attempt >= self.retries or not is_retryable(e):
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                attempt += 1
+                self._bump('retried')
+                print(f"🔁 {type(e).__name__}, retry {attempt}/{self.retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _atimed(self, fn):
+        start = time.perf_counter()
+        result = await fn()
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+    async def _ahedged(self, fn):
+        delay = self.hedge_after()
+        if delay is None:
+            return await self._atimed(fn)
+
+        first = asyncio.ensure_future(self._atimed(fn))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return first.result()
+
+            self._bump('hedged')
+            second = asyncio.ensure_future(self._atimed(fn))
+            tasks.append(second)
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._bump('hedge_wins')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()  # the loser, or both if we were cancelled (ESC)
+
+
+def benchmark(requests=60, latency=0.1, slow_rate=0.05, slow_latency=1.5, error_rate=0.1):
+    """Success rate and latency percentiles against a faulty stand-in server"""
+    from stand_in_server import StandInServer, LatencyProfile
+    from transcription_client import GroqBackend
+
+    print(f"{requests} requests: {latency * 1000:.0f} ms normally, {slow_rate:.0%} take {slow_latency:.1f}s longer,"
+          f" {error_rate:.0%} fail with 429/503")
+
+    setups = (
+        ("no policy", RequestPolicy(retries=0)),
+        ("retries", RequestPolicy(retries=3, backoff=0.1)),
+        ("retries + hedge at p90", RequestPolicy(retries=3, backoff=0.1, hedge=True, min_samples=5)),
+    )
+    for label, policy in setups:
+        profile = LatencyProfile(latency, slow_rate=slow_rate, slow_latency=slow_latency, seed=1)
+        server = StandInServer(profile=profile, error_rate=error_rate / 2, error_status=503, seed=1)
+        with server:
+            server.script.extend([429] * int(requests * error_rate / 2))
+            backend = GroqBackend("stand-in", base_url=server.url, policy=policy)
+            times, ok = [], 0
+            for _ in range(requests):
+                start = time.perf_counter()
+                try:
+                    backend.transcribe(b"\0" * 16000, "audio.flac")
+                    ok += 1
+                    times.append(time.perf_counter() - start)
+                except Exception:
+                    pass
+            backend.close()
+        pct = statistics.quantiles(times, n=100) if len(times) > 1 else [0.0] * 99
+        print(f"  {label:<24} ok {ok:>3}/{requests}  p50 {pct[49] * 1000:6.0f} ms  p90 {pct[89] * 1000:6.0f} ms"
+              f"  p99 {pct[98] * 1000:6.0f} ms  retries {policy.retried}  hedges {policy.hedged}"
+              f" (won {policy.hedge_wins})  server requests {server.requests}")
+
+
+if __name__ == "__main__":
+    # Benchmark: python request_policy.py
+    benchmark()
@@ -0,0 +1,120 @@
+"""
+VoiceGrab Resampler
+Streaming polyphase resampling from the device rate to the upload rate
+"""
+
+import sys
+import time
+from math import gcd
+
+import numpy as np
+
+
+class StreamResampler:
+    """Rational-ratio polyphase FIR resampler that keeps state between blocks.
+
+    The rate ratio is reduced to up/down. A Kaiser-windowed sinc low-pass is
+    split into `up` phases of `taps` coefficients each, and every output
+    sample is one dot product of a phase with the last `taps` input
+    samples. All outputs of a block are computed in one vectorized step;
+    the tail of the input is kept so consecutive blocks join seamlessly.
+    """
+
+    def __init__(self, rate_in, rate_out, channels=1, taps=48, rolloff=0.9, beta=8.0, dtype='float32'):
+        g = gcd(int(rate_in), int(rate_out))
+        self.up = int(rate_out) // g
+        self.down = int(rate_in) // g
+        self.taps = taps
+        self.channels = channels
+        self.dtype = dtype
+
+        # Prototype low-pass at the upsampled rate, cut off just below both
+        # Nyquists (rolloff) so the transition band does not alias
+        n = self.up * taps
+        cutoff = 0.5 * rolloff / max(self.up, self.down)
+        t = np.arange(n) - (n - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n, beta) * self.up
+        self._phases = h.reshape(taps, self.up).T.astype(dtype)  # [phase, tap]
+
+        self._history = np.zeros((taps - 1, channels), dtype=dtype)
+        self._total_in = 0  # absolute input samples consumed
+        self._next_u = 0  # upsampled position of the next output sample
+
+    def process(self, block):
+        """Resample one block, returns the output samples it completes"""
+        buf = np.concatenate((self._history, block.astype(self.dtype, copy=False)))
+        start = self._total_in - len(self._history)  # absolute index of buf[0]
+        self._total_in += len(block)
+        self._history = buf[len(buf) - (self.taps - 1):]
+
+        # Outputs whose newest input sample has now arrived
+        last_u = self._total_in * self.up - 1
+        if last_u < self._next_u:
+            return buf[:0]
+        count = (last_u - self._next_u) // self.down + 1
+        u = self._next_u + self.down * np.arange(count)
+        self._next_u += count * self.down
+
+        base = u // self.up - start
+        windows = buf[base[:, None] - np.arange(self.taps)[None, :]]  # [out, tap, channel]
+        return np.einsum('kt,ktc->kc', self._phases[u % self.up], windows)
+
+
+def benchmark(rate_in=48000, rate_out=16000, seconds=10, block=None):
+    """CPU cost of the callback work with and without in-process resampling"""
+    from audio_capture import CaptureEngine
+
+    block = block or rate_in // 100  # 10 ms blocks, a typical callback size
+    audio = (np.random.default_rng(0).normal(0, 0.1, (int(rate_in * seconds), 1))).astype('float32')
+    forced = audio[::rate_in // rate_out] if rate_in % rate_out == 0 else audio[:int(rate_out * seconds)]
+
+    # Current path: the driver delivers 16 kHz, the callback only copies
+    capture = CaptureEngine(rate_out, seconds + 1)
+    fblock = block * rate_out // rate_in
+    start = time.process_time()
+    for i in range(0, len(forced), fblock):
+        capture.write(forced[i:i + fblock])
+    copy_cost = time.process_time() - start
+
+    # Native path: the callback resamples each block, then copies
+    capture = CaptureEngine(rate_out, seconds + 1)
+    resampler = StreamResampler(rate_in, rate_out)
+    start = time.process_time()
+    for i in range(0, len(audio), block):
+        capture.write(resampler.process(audio[i:i + block]))
+    native_cost = time.process_time() - start
+
+    print(f"{rate_in} -> {rate_out} Hz, {seconds}s of audio in {block}-sample blocks")
+    print(f"  copy only (driver resamples): {copy_cost * 1000:7.1f} ms CPU ({copy_cost / seconds * 100:.2f}% of realtime)")
+    print(f"  resample + copy (native):     {native_cost * 1000:7.1f} ms CPU ({native_cost / seconds * 100:.2f}% of realtime)")
+    print(f"  per block: {native_cost / (len(audio) / block) * 1e6:.0f} us")
+
+
+def benchmark_live(seconds=5, rate_out=16000):
+    """Measure whole-process CPU with the device opened at 16 kHz vs its native rate"""
+    import sounddevice as sd
+    from audio_capture import CaptureEngine
+
+    native = int(sd.query_devices(kind='input')['default_samplerate'])
+    for label, rate in (("driver-side (forced 16 kHz)", rate_out), (f"native ({native} Hz) + resampler", native)):
+        capture = CaptureEngine(rate_out, seconds + 1)
+        resampler = StreamResampler(rate, rate_out) if rate != rate_out else None
+
+        def callback(indata, frames, time_info, status):
+            capture.write(resampler.process(indata) if resampler else indata)
+
+        with sd.InputStream(samplerate=rate, channels=1, callback=callback) as stream:
+            start = time.process_time()
+            time.sleep(seconds)
+            cost = time.process_time() - start
+            latency = stream.latency
+        print(f"  {label:<34} {cost / seconds * 100:5.2f}% CPU, input latency {latency * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    # Benchmark: python resampler.py [--live]
+    for rate in (48000, 44100):
+        benchmark(rate)
+    if '--live' in sys.argv[1:]:
+        print("\nLive capture from the default input device:")
+        benchmark_live()
@@ -0,0 +1,189 @@
+"""
+VoiceGrab Result Cache
+Content-addressed transcription results in memory and on disk (LRU)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+def cache_key(audio, params):
+    """Hash of the encoded audio plus every request parameter (model, prompt, language, ...)"""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(json.dumps(params, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    digest.update(b"\0")
+    digest.update(audio)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Decoded API responses by cache_key(), least recently used evicted first.
+
+    The memory tier holds `memory_entries` responses. With `directory`
+    set, every response is also kept there as `<key>.json`, up to
+    `max_bytes` in total; a file's mtime is its last use, so the LRU order
+    survives restarts. Files are written to a temp name and renamed, a
+    crash never leaves a half-written entry. `hits`, `memory_hits`,
+    `disk_hits` and `misses` count lookups.
+    """
+
+    def __init__(self, memory_entries=64, directory=None, max_bytes=50 * 1024 * 1024):
+        self.memory_entries = memory_entries
+        self.directory = Path(directory) if directory else None
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        return self.directory / f"{key}.json"
+
+    def _remember(self, key, data):
+        """With the lock held: put data in the memory tier"""
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Cached response for key, or None"""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return data
+        data = self._load(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self._remember(key, data)
+            self.hits += 1
+            self.disk_hits += 1
+        return data
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            os.utime(path)  # mark as recently used
+            return data
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, data):
+        """Store a response in both tiers"""
+        with self._lock:
+            self._remember(key, data)
+        if not self.directory:
+            return
+        path = self._path(key)
+        temp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp, path)
+        except OSError as e:
+            print(f"[DEBUG] Cache write failed: {e}")
+            return
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used files until the disk tier fits max_bytes"""
+        if not self.directory:
+            return
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.directory:
+            for path in self.directory.glob("*.json"):
+                path.unlink(missing_ok=True)
+
+    def disk_usage(self):
+        """(entries, bytes) in the disk tier"""
+        if not self.directory:
+            return 0, 0
+        sizes = [path.stat().st_size for path in self.directory.glob("*.json")]
+        return len(sizes), sum(sizes)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (f"{self.hits} hits ({self.memory_hits} memory, {self.disk_hits} disk),"
+                f" {self.misses} misses, {rate:.0%} hit rate")
+
+
+def benchmark(requests=20, latency=0.3):
+    """Repeat requests against a stand-in server: API round trip vs memory vs disk hit"""
+    import statistics
+    import tempfile
+    from stand_in_server import StandInServer, LatencyProfile
+    from transcription_client import GroqBackend
+
+    audio = os.urandom(64000)
+    with tempfile.TemporaryDirectory() as tmp, StandInServer(profile=LatencyProfile(latency)) as server:
+        print(f"{requests} requests for the same clip, server latency {latency * 1000:.0f} ms")
+        backend = GroqBackend("stand-in", base_url=server.url, cache=ResultCache(directory=tmp))
+
+        def run(label, forget_memory=False):
+            times = []
+            for _ in range(requests):
+                if forget_memory:
+                    backend.cache._memory.clear()  # as after a restart
+                start = time.perf_counter()
+                backend.transcribe(audio, "audio.flac")
+                times.append(time.perf_counter() - start)
+            print(f"  {label:<12} median {statistics.median(times) * 1000:8.2f} ms")
+
+        start = time.perf_counter()
+        backend.transcribe(audio, "audio.flac")
+        print(f"  {'miss (API)':<12}        {(time.perf_counter() - start) * 1000:8.2f} ms")
+        run("memory hit")
+        run("disk hit", forget_memory=True)
+        print(f"  {backend.cache.stats()}, API requests {server.requests}")
+        backend.close()
+
+
+if __name__ == "__main__":
+    # python result_cache.py            benchmark
+    # python result_cache.py --clear    empty the cache/ directory
+    import sys
+    if '--clear' in sys.argv[1:]:
+        cache = ResultCache(directory=Path(__file__).parent / "cache")
+        entries, size = cache.disk_usage()
+        cache.clear()
+        print(f"Removed {entries} cached results ({size / 1024:.0f} KB)")
+    else:
+        benchmark()
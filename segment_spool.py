@@ -0,0 +1,163 @@
+"""
+VoiceGrab Segment Spool
+Crash-safe on-disk queue of segments whose transcription failed
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+
+class SegmentSpool:
+    """Encoded segments waiting to be transcribed, kept in `directory`.
+
+    Each segment is stored as its encoded upload file (already FLAC/Opus,
+    so the spool stays small) next to `manifest.jsonl`, an append-only
+    journal of `add` / `attempt` / `done` records. Audio files are written
+    to a temp name, flushed and renamed before their `add` record is
+    appended, and a torn last line from a crash is skipped when the
+    journal is replayed, so a crash at any point loses at most the segment
+    being written. Opening the spool compacts the journal to the entries
+    still pending. Entries that failed `max_attempts` times with an error
+    retrying cannot fix are moved to `failed/` instead of being dropped.
+    """
+
+    MANIFEST = "manifest.jsonl"
+
+    def __init__(self, directory, max_attempts=5):
+        self.directory = Path(directory)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._entries = {}  # id -> entry dict, in spool order
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._replay()
+        self._compact()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # --- Journal ---
+
+    def _replay(self):
+        path = self.directory / self.MANIFEST
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # torn write from a crash
+            op, entry_id = record.pop('op', None), record.get('id')
+            if op == 'add':
+                self._entries[entry_id] = record
+            elif op == 'attempt' and entry_id in self._entries:
+                self._entries[entry_id].update(attempts=record['attempts'], error=record.get('error'))
+            elif op == 'done':
+                self._entries.pop(entry_id, None)
+        # An add whose audio never made it to disk cannot be sent
+        for entry_id in [i for i, e in self._entries.items() if not (self.directory / e['file']).exists()]:
+            del self._entries[entry_id]
+
+    def _compact(self):
+        """Rewrite the journal with only the pending entries, and remove stray files"""
+        path = self.directory / self.MANIFEST
+        temp = path.with_suffix(".tmp")
+        with open(temp, 'w', encoding='utf-8') as f:
+            for entry in self._entries.values():
+                f.write(json.dumps({'op': 'add', **entry}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+        keep = {entry['file'] for entry in self._entries.values()} | {self.MANIFEST}
+        for stray in self.directory.iterdir():
+            if stray.is_file() and stray.name not in keep:
+                stray.unlink(missing_ok=True)
+
+    def _append(self, record):
+        with open(self.directory / self.MANIFEST, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # --- Entries ---
+
+    def add(self, data, filename, mode=None, final=False, error=None):
+        """Spool one encoded segment, returns its entry"""
+        entry_id = f"{time.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        entry = {
+            'id': entry_id,
+            'file': entry_id + Path(filename).suffix,
+            'filename': filename,  # name sent to the API (tells it the format)
+            'mode': mode,
+            'final': final,
+            'created': time.time(),
+            'attempts': 0,
+            'error': error,
+        }
+        path = self.directory / entry['file']
+        temp = path.with_name(path.name + ".part")
+        with open(temp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, path)
+        with self._lock:
+            self._append({'op': 'add', **entry})
+            self._entries[entry_id] = entry
+        return entry
+
+    def pending(self, limit=None):
+        """Entries waiting to be sent, oldest first"""
+        with self._lock:
+            entries = list(self._entries.values())
+        return entries[:limit] if limit else entries
+
+    def read(self, entry):
+        return (self.directory / entry['file']).read_bytes()
+
+    def attempted(self, entry, error, permanent=False):
+        """Record a failed attempt; gives up on the entry after max_attempts permanent errors"""
+        with self._lock:
+            if entry['id'] not in self._entries:
+                return
+            entry['attempts'] += 1
+            entry['error'] = str(error)[:200]
+            self._append({'op': 'attempt', 'id': entry['id'], 'attempts': entry['attempts'],
+                          'error': entry['error']})
+            if not (permanent and entry['attempts'] >= self.max_attempts):
+                return
+            failed = self.directory / "failed"
+            failed.mkdir(exist_ok=True)
+            try:
+                os.replace(self.directory / entry['file'], failed / entry['file'])
+            except FileNotFoundError:
+                pass  # the audio is gone: nothing to keep, still give up on it
+            self._append({'op': 'done', 'id': entry['id']})
+            del self._entries[entry['id']]
+        print(f"❌ Spooled segment {entry['id']} failed {entry['attempts']} times, moved to {failed.name}/")
+
+    def done(self, entry):
+        """Remove an entry that was transcribed"""
+        with self._lock:
+            if self._entries.pop(entry['id'], None) is None:
+                return
+            self._append({'op': 'done', 'id': entry['id']})
+        (self.directory / entry['file']).unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    # List what is waiting: python segment_spool.py [spool_dir]
+    import sys
+    spool = SegmentSpool(sys.argv[1] if len(sys.argv) > 1 else Path(__file__).parent / "spool")
+    entries = spool.pending()
+    print(f"{len(entries)} segment(s) in {spool.directory}")
+    for entry in entries:
+        size = (spool.directory / entry['file']).stat().st_size
+        print(f"  {entry['id']}  {entry['mode'] or '-':<6} {size / 1024:7.1f} KB  attempts {entry['attempts']}"
+              f"  {entry['error'] or ''}")
@@ -0,0 +1,264 @@
+"""
+VoiceGrab Stand-in Server
+Local OpenAI-compatible /audio/transcriptions endpoint for benchmarks
+"""
+
+import email.parser
+import email.policy
+import json
+import os
+import random
+import ssl
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from audio_encoder import audio_duration
+
+
+class LatencyProfile:
+    """Server response time: `base` plus `per_second` of audio (the model's
+    real-time factor), scaled by log-normal `jitter`, plus `slow_latency`
+    for a `slow_rate` share of requests (the tail hedging is for).
+    """
+
+    def __init__(self, base=0.05, per_second=0.0, jitter=0.0, slow_rate=0.0, slow_latency=2.0, seed=None):
+        self.base = base
+        self.per_second = per_second
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, audio_seconds=0.0):
+        """Seconds to answer a request for `audio_seconds` of audio"""
+        with self._lock:
+            scale = self._random.lognormvariate(0, self.jitter) if self.jitter else 1.0
+            slow = self._random.random() < self.slow_rate
+        return (self.base + self.per_second * audio_seconds) * scale + (self.slow_latency if slow else 0.0)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep connections alive like the real API
+    disable_nagle_algorithm = True  # no delayed-ACK stalls on reused connections
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        # One handler instance per accepted connection
+        super().setup()
+        owner = self.server.owner
+        owner._count('connections')
+        if owner.handshake_delay:
+            time.sleep(owner.handshake_delay)  # DNS + TCP + TLS round trips of a remote API
+
+    def _reply(self, status, body=b"", content_type="application/json", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._reply(200)
+
+    def do_GET(self):
+        self._reply(200, b"{}")
+
+    def _form(self, body):
+        """Fields of a multipart/form-data body, name -> bytes"""
+        head = f"Content-Type: {self.headers.get('Content-Type', '')}\r\n\r\n".encode('latin-1')
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(head + body)
+        if not message.is_multipart():
+            return {}
+        return {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+                for part in message.iter_parts()}
+
+    def do_POST(self):
+        owner = self.server.owner
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.path.rstrip('/').endswith("/audio/transcriptions"):
+            self._reply(404, b'{"error": {"message": "not found"}}')
+            return
+        owner._count('requests')
+        form = self._form(body)
+        audio_seconds = audio_duration(form['file']) if form.get('file') else 0.0
+        model = (form.get('model') or b'').decode('utf-8', 'replace')
+        delay = owner.profiles.get(model, owner.profile).sample(audio_seconds)
+        status = owner._plan()
+        quota, retry_after = owner._quota()
+        if retry_after is not None:
+            status = 429
+        if delay:
+            time.sleep(delay)
+        if status != 200:
+            owner._count('errors')
+            error = {"error": {"message": f"stand-in error {status}", "type": "stand_in"}}
+            retry_after = retry_after or (owner.retry_after if status == 429 else None)
+            headers = quota + ([("Retry-After", f"{retry_after:g}")] if retry_after else [])
+            self._reply(status, json.dumps(error).encode('utf-8'), headers=headers)
+            return
+        reply = {"text": owner.text}
+        if form.get('response_format') == b'verbose_json':
+            reply.update(owner.verbose(audio_seconds))
+        self._reply(200, json.dumps(reply, ensure_ascii=False).encode('utf-8'), headers=quota)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hang up on purpose (cancelled hedges, ESC)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StandInServer:
+    """Threaded HTTP(S) server that answers transcription requests.
+
+    Pass `certfile`/`keyfile` to serve HTTPS so TLS handshakes cost what
+    they cost against the real API. `connections` counts accepted
+    connections, which shows whether a client reuses them. Loopback has no
+    network round trips, so `handshake_delay` adds their cost to every new
+    connection.
+
+    Response times follow `profile` (LatencyProfile), or `profiles[model]`
+    for the model named in the request. Faults for testing
+    retries: an `error_rate` share of requests fails with `error_status`,
+    and statuses queued in `script` (None = success) are used for the next
+    requests before any random choice. With `requests_per_minute` set,
+    requests over that quota get 429 and every response carries
+    `x-ratelimit-*` headers like the real API.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, profile=None, profiles=None, text="stand-in transcript",
+                 certfile=None, keyfile=None, handshake_delay=0.0, error_rate=0.0, error_status=503,
+                 retry_after=None, requests_per_minute=0, seed=None):
+        self.profile = profile or LatencyProfile(0.0)
+        self.profiles = profiles or {}
+        self.handshake_delay = handshake_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after  # seconds sent with 429
+        self.script = deque()
+        self.requests_per_minute = requests_per_minute
+        self._accepted = deque()  # times of requests inside the quota window
+        self.text = text
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self._server = _Server((host, port), _Handler)
+        self._server.owner = self
+        self.scheme = "http"
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+            self.scheme = "https"
+        self._thread = None
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _quota(self):
+        """(x-ratelimit headers, Retry-After seconds if over quota)"""
+        if not self.requests_per_minute:
+            return [], None
+        with self._lock:
+            now = time.monotonic()
+            while self._accepted and now - self._accepted[0] >= 60:
+                self._accepted.popleft()
+            over = len(self._accepted) >= self.requests_per_minute
+            if not over:
+                self._accepted.append(now)
+            reset = 60 - (now - self._accepted[0]) if self._accepted else 0.0
+            headers = [
+                ("x-ratelimit-limit-requests", str(self.requests_per_minute)),
+                ("x-ratelimit-remaining-requests", str(self.requests_per_minute - len(self._accepted))),
+                ("x-ratelimit-reset-requests", f"{reset:.2f}s"),
+            ]
+        return headers, (reset if over else None)
+
+    def verbose(self, audio_seconds):
+        """verbose_json extras: `text` as words spread evenly over the audio, without punctuation like Whisper's"""
+        words = [word.strip('.,!?;:"«»()—') for word in self.text.split()]
+        words = [word for word in words if word]
+        step = audio_seconds / len(words) if words else 0.0
+        return {
+            "duration": audio_seconds,
+            "words": [{"word": word, "start": round(i * step, 2), "end": round((i + 1) * step, 2)}
+                      for i, word in enumerate(words)],
+        }
+
+    def _plan(self):
+        """HTTP status for the next transcription request"""
+        with self._lock:
+            if self.script:
+                return self.script.popleft() or 200
+            return self.error_status if self._random.random() < self.error_rate else 200
+
+    @property
+    def url(self):
+        """Root URL; any path ending in /audio/transcriptions is answered"""
+        host, port = self._server.server_address[:2]
+        if self.scheme == "https":
+            host = "localhost"  # the name in the self-signed certificate
+        return f"{self.scheme}://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def self_signed_cert(directory):
+    """Create a throwaway localhost certificate with openssl, returns (cert, key) or None"""
+    certfile = os.path.join(directory, "stand_in.crt")
+    keyfile = os.path.join(directory, "stand_in.key")
+    try:
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+             "-keyout", keyfile, "-out", certfile, "-subj", "/CN=localhost",
+             "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+            check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"[DEBUG] Could not create a certificate: {e}")
+        return None
+    return certfile, keyfile
+
+
+if __name__ == "__main__":
+    # Serve until Ctrl+C: python stand_in_server.py [port] [--base=S] [--per-second=S] [--jitter=X]
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    options = dict(a[2:].replace('-', '_').split('=') for a in sys.argv[1:] if a.startswith('--') and '=' in a)
+    port = int(args[0]) if args else 8765
+    profile = LatencyProfile(**{name: float(value) for name, value in options.items()})
+    with StandInServer(port=port, profile=profile) as server:
+        print(f"Stand-in transcription server on {server.url}/v1 (OpenAI-compatible)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,166 @@
+"""
+VoiceGrab Time Stretch
+Pitch-preserving speed-up of speech (WSOLA) before upload
+"""
+
+import sys
+import time
+
+import numpy as np
+
+
+class TimeStretcher:
+    """Streaming WSOLA (waveform-similarity overlap-add) time compressor.
+
+    Output frames are laid down every `hop` samples with a Hann window at
+    50% overlap, while the input is read every `hop * rate` samples. Each
+    input frame is shifted by up to `tolerance` so that it lines up with
+    the natural continuation of the previous frame, which keeps the pitch
+    and avoids phasing. The candidate search for a frame is one vectorized
+    matrix product; frames themselves are processed in order because each
+    one depends on the previous choice.
+    """
+
+    def __init__(self, rate=1.25, sample_rate=16000, frame_ms=30, tolerance_ms=10):
+        self.rate = rate
+        self.frame = int(sample_rate * frame_ms / 1000) // 2 * 2
+        self.hop = self.frame // 2
+        self.analysis_hop = self.hop * rate
+        self.tolerance = int(sample_rate * tolerance_ms / 1000)
+        self._window = np.hanning(self.frame + 1)[:-1].astype('float32')  # periodic, sums to 1
+
+        self._buf = np.zeros(0, dtype='float32')
+        self._buf_start = 0  # absolute input index of _buf[0]
+        self.input_samples = 0
+        self._k = 0  # next frame index
+        self._prev = None  # absolute input position of the previous frame
+        self._tail = np.zeros(self.hop, dtype='float32')  # second half of the last frame
+        self.output_samples = 0
+
+    def _needed(self, k):
+        """Input end position required to process frame k"""
+        end = int(round(k * self.analysis_hop)) + self.tolerance + self.frame
+        if self._prev is not None:
+            end = max(end, self._prev + self.hop + self.frame)
+        return end
+
+    def _choose(self, k):
+        """Input start position of frame k that best continues the previous frame"""
+        nominal = int(round(k * self.analysis_hop))
+        if self._prev is None:
+            return nominal
+        lo = max(nominal - self.tolerance, 0)
+        hi = nominal + self.tolerance
+        b = self._buf_start
+        natural = self._buf[self._prev + self.hop - b:self._prev + self.hop + self.frame - b]
+        region = self._buf[lo - b:hi + self.frame - b]
+        candidates = np.lib.stride_tricks.sliding_window_view(region, self.frame)
+        energy = np.sqrt(np.einsum('ij,ij->i', candidates, candidates)) + 1e-9
+        scores = (candidates @ natural) / energy
+        return lo + int(np.argmax(scores))
+
+    def _run(self, limit):
+        out = []
+        while self._needed(self._k) <= limit:
+            pos = self._choose(self._k)
+            b = self._buf_start
+            seg = self._buf[pos - b:pos - b + self.frame] * self._window
+            out.append(self._tail + seg[:self.hop])
+            self._tail = seg[self.hop:].copy()
+            self._prev = pos
+            self._k += 1
+
+        # Drop input no later frame can reach
+        keep_from = min(int(round(self._k * self.analysis_hop)) - self.tolerance, self._prev + self.hop) \
+            if self._prev is not None else 0
+        if keep_from > self._buf_start:
+            self._buf = self._buf[keep_from - self._buf_start:]
+            self._buf_start = keep_from
+
+        result = np.concatenate(out) if out else np.zeros(0, dtype='float32')
+        self.output_samples += len(result)
+        return result
+
+    def feed(self, block):
+        """Stretch the next block, returns the output it completes"""
+        mono = block[:, 0] if block.ndim > 1 else block
+        self._buf = np.concatenate((self._buf, mono.astype('float32', copy=False)))
+        self.input_samples += len(mono)
+        return self._run(self._buf_start + len(self._buf)).reshape(-1, 1)
+
+    def flush(self):
+        """Finish the stream: pad the input and emit the last frames"""
+        target = int(round(self.input_samples / self.rate))
+        pad = self.frame + self.tolerance + self.hop + int(self.analysis_hop) + 1
+        self._buf = np.concatenate((self._buf, np.zeros(pad, dtype='float32')))
+        emitted = self.output_samples
+        out = np.concatenate((self._run(self._buf_start + len(self._buf)), self._tail))
+        out = out[:max(target - emitted, 0)]
+        self.output_samples = target
+        return out.reshape(-1, 1)
+
+
+def time_stretch(audio, rate=1.25, sample_rate=16000, **kwargs):
+    """Speed a whole clip up by `rate` without changing its pitch"""
+    stretcher = TimeStretcher(rate, sample_rate, **kwargs)
+    return np.concatenate((stretcher.feed(audio), stretcher.flush()))
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length"""
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    row = np.arange(len(hyp) + 1)
+    for i, word in enumerate(ref, 1):
+        prev, row = row, np.empty_like(row)
+        row[0] = i
+        for j, other in enumerate(hyp, 1):
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + (word != other))
+    return row[-1] / len(ref)
+
+
+def benchmark(paths, rates=(1.0, 1.25, 1.4, 1.5), transcribe=None):
+    """Stretch cost, output length and (optionally) WER against the 1.0x transcript"""
+    import soundfile as sf
+    from audio_encoder import encode_audio, synthetic_speech
+
+    clips = [(p,) + sf.read(p, dtype='float32', always_2d=True) for p in paths]
+    if not clips:
+        clips = [("synthetic speech", synthetic_speech(30).reshape(-1, 1), 16000)]
+
+    for name, audio, sample_rate in clips:
+        duration = len(audio) / sample_rate
+        print(f"\n{name} ({duration:.1f}s)")
+        reference = None
+        for rate in rates:
+            start = time.perf_counter()
+            stretched = time_stretch(audio, rate, sample_rate) if rate != 1.0 else audio
+            cost = time.perf_counter() - start
+            data = encode_audio(stretched, sample_rate, 'flac')
+            line = (f"  {rate:.2f}x  {len(stretched) / sample_rate:6.1f}s  stretch {cost * 1000:7.1f} ms"
+                    f"  flac {len(data) / 1024:6.0f} KB")
+            if transcribe:
+                text = transcribe(data)
+                if reference is None:
+                    reference = text
+                line += f"  WER {word_error_rate(reference, text) * 100:5.1f}%"
+            print(line)
+
+
+if __name__ == "__main__":
+    # Benchmark: python time_stretch.py [clip.wav ...] [--wer]
+    # --wer transcribes every rate with Groq and compares against the 1.0x text
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    transcribe = None
+    if '--wer' in sys.argv[1:]:
+        import os
+        from groq import Groq
+        client = Groq(api_key=os.getenv('GROQ_API_KEY'))
+
+        def transcribe(data):
+            result = client.audio.transcriptions.create(file=("clip.flac", data), model='whisper-large-v3')
+            return result.text
+
+    benchmark(args, transcribe=transcribe)
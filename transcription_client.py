@@ -0,0 +1,349 @@
+"""
+VoiceGrab Transcription Client
+Pluggable API backends (Groq, OpenAI-compatible) on one pooled connection
+"""
+
+import asyncio
+import statistics
+import threading
+import time
+from collections import namedtuple
+
+import httpx
+from groq import AsyncGroq, Groq
+
+from rate_limiter import BACKGROUND
+from request_policy import RequestPolicy
+from result_cache import cache_key
+
+
+# text, timings {'queued', 'request', 'total' seconds, 'attempts', 'cached'}, decoded JSON response
+Transcript = namedtuple('Transcript', 'text timings response')
+
+
+class BackendError(Exception):
+    """HTTP error from an API without its own SDK (status_code/response like the SDK errors)"""
+
+    def __init__(self, response):
+        self.response = response
+        self.status_code = response.status_code
+        try:
+            message = response.json().get('error', {}).get('message', '')
+        except Exception:
+            message = response.text[:200]
+        super().__init__(f"Error code: {self.status_code} - {message}")
+
+
+class TranscriptionBackend:
+    """Audio bytes and mode parameters in, Transcript out.
+
+    Subclasses implement `_post()` for one API. The base class owns what
+    every backend shares: one long-lived httpx connection pool (keep-alive,
+    shared by the segment workers, created on first use), `prewarm()` to
+    open a connection in the background when recording starts, retries and hedging through
+    `policy`, and an optional `limiter` (RateLimiter) that holds each
+    attempt until the quota allows it. With a `cache` (ResultCache), a
+    request identical to an earlier one (same audio bytes and parameters)
+    is answered from it without touching the API or the quota.
+    `atranscribe()`/`aprewarm()` do the same on an asyncio event loop with
+    their own async connection pool; an app that only uses those never
+    opens the sync one.
+    """
+
+    default_url = None
+
+    def __init__(self, api_key, base_url=None, max_connections=8, keepalive_expiry=120.0,
+                 timeout=60.0, verify=True, policy=None, limiter=None, cache=None):
+        self.api_key = api_key
+        self.base_url = (base_url or self.default_url).rstrip('/')
+        self._http_options = dict(
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections,
+                                keepalive_expiry=keepalive_expiry),
+            timeout=timeout,
+            verify=verify,
+        )
+        self._http = None  # httpx.Client, only for the sync transcribe()/prewarm()
+        self._ahttp = None  # httpx.AsyncClient, created on the loop that uses it
+        self.policy = policy or RequestPolicy()
+        self.limiter = limiter
+        self.cache = cache
+        self.server = None  # StandInServer owned by this backend, if any
+        self._warming = threading.Lock()
+
+    def _post(self, filename, audio, params):
+        """Send one request, returns (decoded JSON, response headers)"""
+        raise NotImplementedError
+
+    async def _apost(self, filename, audio, params):
+        """_post() on the event loop"""
+        raise NotImplementedError
+
+    def _sync_http(self):
+        if self._http is None:
+            self._http = httpx.Client(**self._http_options)
+        return self._http
+
+    def _async_http(self):
+        if self._ahttp is None:
+            self._ahttp = httpx.AsyncClient(**self._http_options)
+        return self._ahttp
+
+    @staticmethod
+    def _params(model, language, prompt, temperature, response_format, timestamp_granularities=None):
+        params = {'model': model, 'response_format': response_format, 'temperature': temperature}
+        if timestamp_granularities:
+            params['timestamp_granularities'] = list(timestamp_granularities)  # verbose_json only
+        if prompt:
+            params['prompt'] = prompt
+        # Only set language if not 'auto'
+        if language and language != 'auto':
+            params['language'] = language
+        return params
+
+    @staticmethod
+    def _cached(data, start):
+        timings = {'queued': 0.0, 'request': 0.0, 'attempts': 0, 'cached': True,
+                   'total': time.perf_counter() - start}
+        return Transcript(data.get('text', ''), timings, data)
+
+    def _update_limiter(self, error=None, headers=None):
+        if self.limiter is None:
+            return
+        response = getattr(error, 'response', None)
+        if response is not None:
+            self.limiter.update(response.headers, response.status_code)
+        elif headers is not None:
+            self.limiter.update(headers)
+
+    def transcribe(self, audio, filename="audio.wav", model="whisper-large-v3", language=None,
+                   prompt=None, temperature=0.0, response_format='json', audio_seconds=0.0,
+                   priority=BACKGROUND, timestamp_granularities=None):
+        """Transcribe one encoded file held in memory"""
+        params = self._params(model, language, prompt, temperature, response_format, timestamp_granularities)
+        timings = {'queued': 0.0, 'request': 0.0, 'attempts': 0, 'cached': False}
+        start = time.perf_counter()
+        key = cache_key(audio, params) if self.cache else None
+        if key and (data := self.cache.get(key)) is not None:
+            return self._cached(data, start)
+
+        def attempt():
+            timings['attempts'] += 1
+            if self.limiter:
+                timings['queued'] += self.limiter.acquire(audio_seconds, priority)
+            sent = time.perf_counter()
+            try:
+                data, headers = self._post(filename, audio, params)
+            except Exception as e:
+                self._update_limiter(error=e)
+                raise
+            finally:
+                timings['request'] = time.perf_counter() - sent
+            self._update_limiter(headers=headers)
+            return data
+
+        data = self.policy.call(attempt)
+        if key:
+            self.cache.put(key, data)
+        timings['total'] = time.perf_counter() - start
+        return Transcript(data.get('text', ''), timings, data)
+
+    async def atranscribe(self, audio, filename="audio.wav", model="whisper-large-v3", language=None,
+                          prompt=None, temperature=0.0, response_format='json', audio_seconds=0.0,
+                          priority=BACKGROUND, timestamp_granularities=None):
+        """transcribe() on the event loop; cancelling it aborts the upload"""
+        params = self._params(model, language, prompt, temperature, response_format, timestamp_granularities)
+        timings = {'queued': 0.0, 'request': 0.0, 'attempts': 0, 'cached': False}
+        start = time.perf_counter()
+        key = cache_key(audio, params) if self.cache else None
+        # The disk tier is file I/O: keep it off the event loop
+        if key and (data := await asyncio.to_thread(self.cache.get, key)) is not None:
+            return self._cached(data, start)
+
+        async def attempt():
+            timings['attempts'] += 1
+            if self.limiter:
+                timings['queued'] += await self.limiter.acquire_async(audio_seconds, priority)
+            sent = time.perf_counter()
+            try:
+                data, headers = await self._apost(filename, audio, params)
+            except Exception as e:
+                self._update_limiter(error=e)
+                raise
+            finally:
+                timings['request'] = time.perf_counter() - sent
+            self._update_limiter(headers=headers)
+            return data
+
+        data = await self.policy.acall(attempt)
+        if key:
+            await asyncio.to_thread(self.cache.put, key, data)
+        timings['total'] = time.perf_counter() - start
+        return Transcript(data.get('text', ''), timings, data)
+
+    def prewarm(self):
+        """Open a pooled connection in the background (uses no API quota)"""
+        if not self._warming.acquire(blocking=False):
+            return  # already warming
+        threading.Thread(target=self._prewarm, daemon=True).start()
+
+    def _prewarm(self):
+        try:
+            # Any response will do: the point is the TCP + TLS handshake
+            self._sync_http().head(self.base_url, timeout=5.0)
+        except Exception as e:
+            print(f"[DEBUG] Pre-warm failed: {e}")
+        finally:
+            self._warming.release()
+
+    async def aprewarm(self):
+        """prewarm() for the async connection pool"""
+        try:
+            await self._async_http().head(self.base_url, timeout=5.0)
+        except Exception as e:
+            print(f"[DEBUG] Pre-warm failed: {e}")
+
+    def close(self):
+        if self._http:
+            self._http.close()
+        if self.server:
+            self.server.stop()
+
+
+class GroqBackend(TranscriptionBackend):
+    """Groq's hosted Whisper through the official SDK (SDK retries off, the policy retries)"""
+
+    default_url = "https://api.groq.com"
+
+    def __init__(self, api_key, base_url=None, **kwargs):
+        super().__init__(api_key, base_url, **kwargs)
+        self._client = None
+        self._aclient = None
+
+    def _post(self, filename, audio, params):
+        if self._client is None:
+            self._client = Groq(api_key=self.api_key, base_url=self.base_url,
+                                http_client=self._sync_http(), max_retries=0)
+        raw = self._client.audio.transcriptions.with_raw_response.create(file=(filename, audio), **params)
+        return raw.http_response.json(), raw.headers
+
+    async def _apost(self, filename, audio, params):
+        if self._aclient is None:
+            self._aclient = AsyncGroq(api_key=self.api_key, base_url=self.base_url,
+                                      http_client=self._async_http(), max_retries=0)
+        raw = await self._aclient.audio.transcriptions.with_raw_response.create(file=(filename, audio), **params)
+        return raw.http_response.json(), raw.headers
+
+
+class OpenAICompatibleBackend(TranscriptionBackend):
+    """Any server with OpenAI's POST {base_url}/audio/transcriptions (OpenAI, self-hosted Whisper)"""
+
+    default_url = "https://api.openai.com/v1"
+
+    def _request(self, filename, audio, params):
+        return dict(
+            url=f"{self.base_url}/audio/transcriptions",
+            headers={'Authorization': f"Bearer {self.api_key}"} if self.api_key else {},
+            files={'file': (filename, audio)},
+            # Lists are repeated form fields named key[] (timestamp_granularities[])
+            data={f"{key}[]" if isinstance(value, list) else key: value if isinstance(value, list) else str(value)
+                  for key, value in params.items()},
+        )
+
+    @staticmethod
+    def _decode(response):
+        if response.status_code >= 400:
+            raise BackendError(response)
+        if 'json' not in response.headers.get('content-type', ''):
+            return {'text': response.text}, response.headers  # response_format text/srt/vtt
+        return response.json(), response.headers
+
+    def _post(self, filename, audio, params):
+        return self._decode(self._sync_http().post(**self._request(filename, audio, params)))
+
+    async def _apost(self, filename, audio, params):
+        return self._decode(await self._async_http().post(**self._request(filename, audio, params)))
+
+
+BACKENDS = {
+    'groq': GroqBackend,
+    'openai': OpenAICompatibleBackend,
+}
+
+
+def create_backend(provider='groq', api_key='', base_url=None, stand_in=None, **kwargs):
+    """Backend for api.provider: groq, openai (any compatible URL) or stand-in (local fake)"""
+    if provider == 'stand-in':
+        # In-process fake API so the whole pipeline can be run and timed offline
+        from stand_in_server import StandInServer, LatencyProfile
+        server = StandInServer(profile=LatencyProfile(**(stand_in or {}))).start()
+        backend = OpenAICompatibleBackend(api_key, base_url=f"{server.url}/v1", **kwargs)
+        backend.server = server
+        return backend
+    if provider not in BACKENDS:
+        raise ValueError(f"Unknown API provider '{provider}' (use {', '.join(BACKENDS)} or stand-in)")
+    return BACKENDS[provider](api_key, base_url or None, **kwargs)
+
+
+def benchmark(requests=20, latency=0.05, handshake=0.06, speaking=0.5, https=True):
+    """Per-request latency of a fresh client per call vs the pooled client"""
+    import ssl
+    import tempfile
+    from stand_in_server import StandInServer, LatencyProfile, self_signed_cert
+
+    audio = b"\0" * 32000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert = self_signed_cert(tmp) if https else None
+        if https and not cert:
+            print("openssl not available, falling back to plain HTTP")
+        verify = ssl.create_default_context(cafile=cert[0]) if cert else True
+        server = StandInServer(profile=LatencyProfile(latency), certfile=cert and cert[0],
+                               keyfile=cert and cert[1], handshake_delay=handshake)
+
+        with server:
+            print(f"{requests} requests to {server.url}, server latency {latency * 1000:.0f} ms,"
+                  f" {handshake * 1000:.0f} ms extra per new connection")
+
+            def run(label, call):
+                before = server.connections
+                times = []
+                for _ in range(requests):
+                    start = time.perf_counter()
+                    call()
+                    times.append(time.perf_counter() - start)
+                print(f"  {label:<28} median {statistics.median(times) * 1000:6.1f} ms"
+                      f"  max {max(times) * 1000:6.1f} ms  connections {server.connections - before}")
+
+            # Old path: a new client (and connection) for every utterance
+            def fresh():
+                http = httpx.Client(verify=verify)
+                client = Groq(api_key="stand-in", base_url=server.url, http_client=http)
+                client.audio.transcriptions.create(file=("audio.flac", audio), model='whisper-large-v3')
+                http.close()
+            run("fresh client per request", fresh)
+
+            pooled = GroqBackend("stand-in", base_url=server.url, verify=verify)
+            run("pooled client", lambda: pooled.transcribe(audio, "audio.flac"))
+            pooled.close()
+
+            # First request of a session: cold pool vs pre-warmed on hotkey press
+            for label, warm in (("first request, cold", False), ("first request, pre-warmed", True)):
+                times = []
+                for _ in range(max(requests // 4, 3)):
+                    backend = GroqBackend("stand-in", base_url=server.url, verify=verify)
+                    if warm:
+                        backend.prewarm()
+                    time.sleep(speaking)  # the user talks
+                    start = time.perf_counter()
+                    backend.transcribe(audio, "audio.flac")
+                    times.append(time.perf_counter() - start)
+                    backend.close()
+                print(f"  {label:<28} median {statistics.median(times) * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    # Benchmark: python transcription_client.py [--http] [--handshake=MS]
+    import sys
+    handshake = next((float(a.split('=')[1]) / 1000 for a in sys.argv[1:] if a.startswith('--handshake=')), 0.06)
+    benchmark(handshake=handshake, https='--http' not in sys.argv[1:])
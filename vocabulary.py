@@ -0,0 +1,179 @@
+"""
+VoiceGrab Vocabulary
+Spoken form → canonical term replacement with an Aho-Corasick automaton
+"""
+
+import json
+import re
+from collections import deque
+from pathlib import Path
+
+
+class AhoCorasick:
+    """All occurrences of many keys in one left-to-right scan.
+
+    Keys are matched case-insensitively. Building is linear in the total
+    key length and a scan is linear in the text length plus the number of
+    matches, however many keys there are.
+    """
+
+    def __init__(self, keys):
+        self._goto = [{}]  # state -> {char: state}
+        self._fail = [0]
+        self._out = [[]]  # state -> lengths of the keys ending here
+        for key in keys:
+            self._add(key.lower())
+        self._link()
+
+    def _add(self, key):
+        state = 0
+        for char in key:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        if key and len(key) not in self._out[state]:
+            self._out[state].append(len(key))
+
+    def _link(self):
+        """Breadth-first failure links; each state also reports its suffixes' keys"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def finditer(self, text):
+        """(start, end) of every key occurrence, overlapping ones included"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length in out[state]:
+                yield index + 1 - length, index + 1
+
+
+def _lower(text):
+    """text.lower() that keeps every character at its index"""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(char.lower() if len(char.lower()) == 1 else char for char in text)
+
+
+class Vocabulary:
+    """Replaces spoken forms with canonical terms, whole words only.
+
+    `terms` maps a spoken form ("гит хаб") to its canonical term
+    ("GitHub"). A match counts only when the characters around it are not
+    `word_chars` (the same rule as filler words), and overlapping matches
+    are resolved leftmost first, then longest, so "докер компоуз" beats
+    "докер". Replacing is one automaton scan however large the dictionary.
+    """
+
+    def __init__(self, terms, word_chars='а-яА-Яa-zA-Z'):
+        self.terms = {_lower(' '.join(spoken.split())): canonical
+                      for spoken, canonical in terms.items() if spoken.strip()}
+        self._matcher = AhoCorasick(self.terms)
+        self._word_char = re.compile(f'[{word_chars}]')
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _boundary(self, text, index):
+        return index < 0 or index >= len(text) or not self._word_char.match(text[index])
+
+    def replace(self, text):
+        if not self.terms:
+            return text
+        lowered = _lower(text)
+        matches = [(start, -end) for start, end in self._matcher.finditer(lowered)
+                   if self._boundary(text, start - 1) and self._boundary(text, end)]
+        if not matches:
+            return text
+        parts, position = [], 0
+        for start, end in sorted(matches):  # leftmost first, then longest
+            end = -end
+            if start < position:
+                continue  # overlaps a term already replaced
+            parts += [text[position:start], self.terms[lowered[start:end]]]
+            position = end
+        parts.append(text[position:])
+        return ''.join(parts)
+
+
+def load_terms(path):
+    """Terms from a file: JSON {"spoken": "Canonical"} or lines `spoken, other spoken = Canonical`.
+
+    In the line format `#` starts a comment and a tab works like `=`.
+    """
+    path = Path(path)
+    text = path.read_text(encoding='utf-8-sig')
+    if path.suffix.lower() == '.json':
+        return json.loads(text)
+    terms = {}
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        spoken, separator, canonical = line.replace('\t', '=', 1).partition('=')
+        if not separator or not canonical.strip():
+            print(f"⚠️ {path.name}:{number}: expected 'spoken = Canonical'")
+            continue
+        for form in spoken.split(','):
+            terms[form.strip()] = canonical.strip()
+    return terms
+
+
+def benchmark(entries=(100, 1000, 5000), words=2000, repeats=5):
+    """One regex per entry vs the automaton, on a long transcript"""
+    import random
+    import time
+
+    rng = random.Random(1)
+    letters = 'абвгдежзиклмнопрстуфхцчшщэюя'
+    spoken = lambda: ' '.join(''.join(rng.choice(letters) for _ in range(rng.randint(3, 8)))
+                              for _ in range(rng.randint(1, 2)))
+    common = {"докер": "Docker", "гит хаб": "GitHub", "пайтон": "Python", "докер компоуз": "Docker Compose"}
+    filler = "нужно поднять докер компоуз и залить на гит хаб скрипт на пайтон потом проверить".split()
+    text = ' '.join(rng.choice(filler) for _ in range(words))
+
+    print(f"{words}-word transcript")
+    for count in entries:
+        terms = dict(common, **{spoken(): f"Term{i}" for i in range(count - len(common))})
+        start = time.perf_counter()
+        vocabulary = Vocabulary(terms)
+        built = (time.perf_counter() - start) * 1000
+
+        def per_entry():
+            result = text
+            for form in sorted(terms, key=len, reverse=True):
+                result = re.sub(r'(?<![а-яА-Яa-zA-Z])' + re.escape(form) + r'(?![а-яА-Яa-zA-Z])',
+                                lambda m, term=terms[form]: term, result, flags=re.IGNORECASE)
+            return result
+
+        timings = []
+        for replace in (per_entry, lambda: vocabulary.replace(text)):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                result = replace()
+            timings.append((time.perf_counter() - start) / repeats * 1000)
+        print(f"  {count:>5} entries: regex per entry {timings[0]:8.1f} ms, automaton {timings[1]:5.1f} ms"
+              f" (built in {built:.0f} ms)")
+    print(f"  '{vocabulary.replace('Запусти докер компоуз, потом Докер и гит хаб; а докеры не трогай')}'")
+
+
+if __name__ == "__main__":
+    # Benchmark: python vocabulary.py
+    benchmark()
@@ -0,0 +1,191 @@
+"""
+VoiceGrab Voice Activity
+Frame energy / zero-crossing VAD that trims silence before upload
+"""
+
+import numpy as np
+
+
+class SilenceTrimmer:
+    """Streaming silence trimmer.
+
+    Audio is classified in short frames by energy (relative to a running
+    noise floor) and zero-crossing rate. Leading and trailing silence is
+    cut down to `pad` seconds and interior pauses longer than `max_pause`
+    are shortened to `max_pause`. Blocks can be fed as they are captured;
+    silence is held back until it is known whether speech follows.
+    """
+
+    def __init__(self, sample_rate=16000, max_pause=1.5, pad=0.3, frame_ms=30,
+                 margin_db=10.0, min_db=-50.0, floor_window=3.0):
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.pad = int(sample_rate * pad)
+        self.half_pause = int(sample_rate * max_pause / 2)
+        self.max_pause = 2 * self.half_pause
+        self.margin_db = margin_db
+        self.min_db = min_db
+
+        # Noise floor: low percentile of recent frame energies
+        self.noise_floor = min_db - margin_db
+        self._history = np.zeros(0)
+        self._history_frames = int(floor_window * 1000 / frame_ms)
+        self.started = False  # speech seen yet
+
+        self._rest = None  # incomplete frame carried to the next block
+        self._empty = np.zeros((0, 1), dtype='float32')
+        self._pending = []  # held silence (head and tail only, see _hold)
+        self._pending_len = 0  # true length of the held silence
+
+        # Stats in samples
+        self.input_samples = 0
+        self.kept_samples = 0
+        self.removed_leading = 0
+        self.removed_interior = 0
+        self.removed_trailing = 0
+
+    def _classify(self, frames):
+        """Vectorized speech/silence decision per frame"""
+        x = frames.reshape(-1, self.frame, frames.shape[1]).mean(axis=2)
+        energy = 10 * np.log10(np.mean(x * x, axis=1) + 1e-10)
+        zcr = np.mean(np.signbit(x[:, 1:]) != np.signbit(x[:, :-1]), axis=1)
+
+        # Gaps between words keep the 10th percentile near the noise floor
+        history = np.concatenate((self._history, energy))
+        self.noise_floor = np.percentile(history, 10)
+        self._history = history[-self._history_frames:]
+
+        threshold = max(self.noise_floor + self.margin_db, self.min_db)
+        # Unvoiced consonants are quieter but have a high zero-crossing rate
+        return (energy > threshold) | ((energy > threshold - 6) & (zcr > 0.25))
+
+    def _hold(self, chunk):
+        """Hold back silence, keeping only the head and tail that may be emitted"""
+        self._pending.append(chunk)
+        self._pending_len += len(chunk)
+        keep = max(self.half_pause, self.pad)
+        stored = sum(len(c) for c in self._pending)
+        if stored > 2 * keep + self.sample_rate:
+            silence = np.concatenate(self._pending)
+            self._pending = [silence[:keep], silence[-keep:]]
+
+    def _take_pending(self):
+        silence = np.concatenate(self._pending) if self._pending else None
+        total = self._pending_len
+        self._pending = []
+        self._pending_len = 0
+        return silence, total
+
+    def _release(self, out):
+        """Speech resumed: emit the part of the held silence that is kept"""
+        silence, total = self._take_pending()
+        if silence is None:
+            return
+        if not self.started:
+            kept = silence[len(silence) - min(self.pad, len(silence)):]
+            self.removed_leading += total - len(kept)
+        elif total <= self.max_pause:
+            kept = silence
+        else:
+            kept = np.concatenate((silence[:self.half_pause], silence[-self.half_pause:]))
+            self.removed_interior += total - len(kept)
+        out.append(kept)
+
+    def feed(self, block):
+        """Process the next captured block, return the audio to keep"""
+        self.input_samples += len(block)
+        self._empty = block[:0]
+        if self._rest is not None:
+            block = np.concatenate((self._rest, block))
+        usable = len(block) // self.frame * self.frame
+        self._rest = block[usable:].copy() if usable < len(block) else None
+        if usable == 0:
+            return self._empty
+
+        frames = block[:usable]
+        speech = self._classify(frames)
+
+        # Walk runs of equal decisions rather than single frames
+        edges = np.flatnonzero(np.diff(speech.astype(np.int8))) + 1
+        starts = np.concatenate(([0], edges))
+        ends = np.concatenate((edges, [len(speech)]))
+
+        out = []
+        for s, e in zip(starts, ends):
+            chunk = frames[s * self.frame:e * self.frame]
+            if speech[s]:
+                self._release(out)
+                out.append(chunk)
+                self.started = True
+            else:
+                self._hold(chunk)
+
+        if not out:
+            return self._empty
+        kept = np.concatenate(out)
+        self.kept_samples += len(kept)
+        return kept
+
+    def flush(self):
+        """End of segment: keep `pad` of trailing silence and drop the rest"""
+        if self._rest is not None:
+            self._hold(self._rest)
+            self._rest = None
+        silence, total = self._take_pending()
+        if silence is None:
+            return self._empty
+        if not self.started:
+            self.removed_leading += total
+            return self._empty
+        kept = silence[:self.pad]
+        self.removed_trailing += total - len(kept)
+        self.kept_samples += len(kept)
+        return kept
+
+    def trailing_silence(self):
+        """Seconds of silence since the last speech (0 before any speech)"""
+        if not self.started:
+            return 0.0
+        rest = len(self._rest) if self._rest is not None else 0
+        return (self._pending_len + rest) / self.sample_rate
+
+    def has_speech(self):
+        """True once any frame was classified as speech"""
+        return self.started
+
+    def stats(self):
+        """Seconds of input, kept audio and removed silence"""
+        sr = float(self.sample_rate)
+        return {
+            'input': self.input_samples / sr,
+            'kept': self.kept_samples / sr,
+            'leading': self.removed_leading / sr,
+            'interior': self.removed_interior / sr,
+            'trailing': self.removed_trailing / sr,
+        }
+
+
+def trim_silence(audio, sample_rate=16000, **kwargs):
+    """Trim a whole clip in one go, returns (trimmed audio, trimmer)"""
+    trimmer = SilenceTrimmer(sample_rate, **kwargs)
+    if audio.ndim == 1:
+        audio = audio.reshape(-1, 1)
+    trimmed = np.concatenate((trimmer.feed(audio), trimmer.flush()))
+    return trimmed, trimmer
+
+
+def find_quietest_point(audio, sample_rate=16000, frame_ms=30, smooth_ms=150):
+    """Sample index of the quietest moment in audio.
+
+    Frame energies are smoothed over `smooth_ms` so a single quiet frame
+    inside a word does not win over a real pause between words.
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    count = len(audio) // frame
+    if count == 0:
+        return len(audio)
+    x = audio[:count * frame].reshape(count, frame, -1).mean(axis=2)
+    energy = np.mean(x * x, axis=1)
+    width = max(1, int(smooth_ms / frame_ms))
+    smoothed = np.convolve(energy, np.ones(width) / width, mode='same')
+    return int(np.argmin(smoothed)) * frame + frame // 2
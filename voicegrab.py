@@ -5,17 +5,13 @@ Main transcription script with config support
 
 import os
 import sys
+import io
 import time
-import queue
-import tempfile
+import asyncio
 import threading
-import re
 from pynput import keyboard as pynput_keyboard
 import sounddevice as sd
-import soundfile as sf
 import numpy as np
-import pyperclip
-from groq import Groq
 from pathlib import Path
 
 # Script directory
@@ -64,10 +60,28 @@ atexit.register(cleanup_lock)
 # Import config
 sys.path.insert(0, str(SCRIPT_DIR))
 from config_schema import get_config
+from audio_capture import CaptureEngine
+from audio_encoder import StreamingEncoder, encode_audio, decode_audio, get_extension, audio_duration
+from voice_activity import SilenceTrimmer, find_quietest_point
+from core_pipeline import CorePipeline, Job
+from resampler import StreamResampler
+from time_stretch import TimeStretcher
+from transcription_client import create_backend
+from request_policy import RequestPolicy, is_retryable
+from rate_limiter import RateLimiter, FINAL, BACKGROUND
+from result_cache import ResultCache
+from segment_spool import SegmentSpool
+from model_router import ModelRouter, GROQ_MODELS, GROQ_ROUTES
+from chunked_transcription import transcribe_chunked
+from text_cleanup import CleanupEngine, enabled
+from profanity_filter import ProfanityCensor
+from output_sinks import create_sink
+from event_server import EventServer
 
 # Load config
 config = get_config(str(SCRIPT_DIR / "config.json"))
 cfg = config.load()
+config_mtime = config.path.stat().st_mtime if config.exists() else None
 
 # Also load from .env if API key not in config
 if not cfg.get('api', {}).get('key'):
@@ -79,15 +93,58 @@ if not cfg.get('api', {}).get('key'):
 
 # --- Configuration from config.json ---
 API_KEY = cfg.get('api', {}).get('key', '')
+PROVIDER = cfg.get('api', {}).get('provider', 'groq')
+BASE_URL = cfg.get('api', {}).get('base_url', '')
+STAND_IN = cfg.get('api', {}).get('stand_in', {})
+RETRIES = cfg.get('api', {}).get('retries', 3)
+HEDGE = cfg.get('api', {}).get('hedge', False)
+HEDGE_DELAY = cfg.get('api', {}).get('hedge_delay', 0)
+REQUESTS_PER_MINUTE = cfg.get('api', {}).get('requests_per_minute', 20)
+AUDIO_SECONDS_PER_HOUR = cfg.get('api', {}).get('audio_seconds_per_hour', 7200)
+ROUTES = cfg.get('api', {}).get('routes', [])
+MODEL_BUDGETS = cfg.get('api', {}).get('models', {})
+CACHE = cfg.get('api', {}).get('cache', {})
+SPOOL = cfg.get('api', {}).get('spool', {})
 INPUT_MODE = cfg.get('input', {}).get('mode', 'toggle')
 MAX_DURATION = cfg.get('global', {}).get('max_duration', 180)
+SAVE_AUDIO = cfg.get('global', {}).get('save_audio', False)  # reloaded with the modes
 SAMPLE_RATE = cfg.get('recording', {}).get('sample_rate', 16000)
 CHANNELS = 1
+NATIVE_RATE = cfg.get('recording', {}).get('native_rate', True)
+PREROLL = cfg.get('recording', {}).get('preroll', 0.4)
+UPLOAD_FORMAT = cfg.get('recording', {}).get('upload_format', 'flac')
+OPUS_BITRATE = cfg.get('recording', {}).get('opus_bitrate', 24)
+TRIM_SILENCE = cfg.get('recording', {}).get('trim_silence', True)
+MAX_PAUSE = cfg.get('recording', {}).get('max_pause', 1.5)
+SILENCE_PAD = cfg.get('recording', {}).get('silence_pad', 0.3)
+SPLIT_WINDOW = cfg.get('recording', {}).get('split_window', 10)
+PIPELINED = cfg.get('recording', {}).get('pipelined', False)
+PHRASE_PAUSE = cfg.get('recording', {}).get('phrase_pause', 0.6)
+PHRASE_MIN = cfg.get('recording', {}).get('phrase_min', 8)
+SEGMENT_WORKERS = cfg.get('recording', {}).get('segment_workers', 2)
+MAX_PENDING_SEGMENTS = cfg.get('recording', {}).get('max_pending_segments', 8)
+CHUNK_LONG = cfg.get('recording', {}).get('chunk_long', True)
+CHUNK_MIN = cfg.get('recording', {}).get('chunk_min', 90)
+CHUNK_SECONDS = cfg.get('recording', {}).get('chunk_seconds', 60)
+CHUNK_OVERLAP = cfg.get('recording', {}).get('chunk_overlap', 1.0)
+CHUNK_WORKERS = cfg.get('recording', {}).get('chunk_workers', 4)
+PROFANITY = cfg.get('profanity', {})
+OUTPUT = cfg.get('output', {})
+EVENTS = cfg.get('events', {})
 
 # Modes from new config structure
 MODES = cfg.get('modes', {})
 DEFAULT_MODE = 'ai'
 current_mode = DEFAULT_MODE
+cleanup = CleanupEngine(MODES, SCRIPT_DIR)  # compiled cleanup per mode, rebuilt when the settings are reloaded
+profanity = ProfanityCensor(MODES, SCRIPT_DIR / PROFANITY.get('directory', 'profanity'),
+                            PROFANITY.get('languages', ['ru']), PROFANITY.get('roots', []))
+try:
+    output = create_sink(OUTPUT.get('sink', 'paste'), SCRIPT_DIR / OUTPUT.get('file', 'transcripts.txt'),
+                         OUTPUT.get('type_max_chars', 200), OUTPUT.get('paste_timeout', 0.5))
+except ValueError as e:
+    print(f"[ERROR] {e}, pasting instead")
+    output = create_sink('paste', paste_timeout=OUTPUT.get('paste_timeout', 0.5))
 
 def normalize_hotkey(hotkey):
     """Convert config hotkey to pynput key identifier"""
@@ -134,8 +191,23 @@ HOTKEY_KEY = get_pynput_key(HOTKEY_NAME)
 USE_INDICATOR = cfg.get('ui', {}).get('floating_indicator', True)
 
 # --- Global State ---
+# Owned by the core event loop: other threads only post commands to it
 recording = False
-audio_queue = queue.Queue()
+stopping = False  # a stop command is still cutting the last segment
+# Preallocated ring buffer: room for two full segments plus slack, so a
+# segment handed to a background worker is not overwritten while in use
+capture = CaptureEngine(sample_rate=SAMPLE_RATE, capacity_seconds=MAX_DURATION * 2 + 10, channels=CHANNELS)
+overruns_reported = 0  # capture.overruns already announced
+encoder = None  # StreamingEncoder for the segment being recorded
+resampler = None  # StreamResampler when the device runs at its own rate
+# Pipelined mode: phrases sent while recording, joined in order at stop
+phrase_futures = []
+core = None  # CorePipeline (event loop + segment stages), created in main()
+backend = None  # TranscriptionBackend shared by all workers, created in main()
+router = None  # ModelRouter, created in main()
+spool = None  # SegmentSpool for failed segments, created in main()
+events = None  # EventServer for local subscribers, created in main() if enabled
+spool_ready = asyncio.Event()  # set when the API answers again: drain the spool now
 record_start_time = 0
 indicator = None
 
@@ -164,128 +236,301 @@ def get_prompt(mode_key):
     return ''
 
 
-def should_cleanup(mode_key):
-    """Check if filler cleanup is enabled for mode"""
-    if mode_key in MODES:
-        return MODES[mode_key].get('filler_cleanup', False)
-    return False
+def cleanup_text(text, mode_key):
+    """Remove filler words and garbage phrases (Whisper hallucinations), fix the mode's vocabulary"""
+    return cleanup.clean(text, mode_key)
 
 
-def cleanup_text(text, mode_key):
-    """Remove filler words and garbage phrases (Whisper hallucinations)"""
-    mode_data = MODES.get(mode_key, {})
-    
-    # Check if hallucination filter is enabled (default True)
-    hallucination_filter = mode_data.get('hallucination_filter', True)
-    
-    # Remove garbage phrases only if enabled
-    if hallucination_filter:
-        # Get garbage phrases from config, with defaults
-        default_garbage = [
-            "Продолжение следует", "продолжение следует",
-            "Продолжение следует...", "продолжение следует...",
-            "To be continued", "to be continued",
-            "Thank you for watching", "Спасибо за просмотр",
-            "Подписывайтесь на канал", "Subscribe", "Subtitles by",
-            "[Music]", "[Музыка]", "(music)", "(музыка)",
-            "Редактор субтитров", "Корректор",
-        ]
-        
-        garbage_phrases = mode_data.get('garbage_phrases', default_garbage)
-        
-        # Handle comma-separated string from UI
-        if isinstance(garbage_phrases, str):
-            garbage_phrases = [p.strip() for p in garbage_phrases.split(',') if p.strip()]
-        
-        for phrase in garbage_phrases:
-            # Case-insensitive replacement
-            text = re.sub(re.escape(phrase), '', text, flags=re.IGNORECASE)
-    
-    # Get filler_words from CURRENT mode
-    filler_words = mode_data.get('filler_words', [])
-    if filler_words:
-        # Handle both list and comma-separated string
-        if isinstance(filler_words, str):
-            filler_words = [w.strip() for w in filler_words.split(',') if w.strip()]
-        
-        # Remove filler words (as separate words)
-        for word in filler_words:
-            # Word boundaries for Russian and English
-            pattern = r'(?<![а-яА-Яa-zA-Z])' + re.escape(word) + r'(?![а-яА-Яa-zA-Z])'
-            text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-    
-    # Clean up extra spaces
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'\s+([.,!?])', r'\1', text)
-    
-    return text.strip()
+def postprocess_text(text, mode_key):
+    """Everything applied to a transcript before it is pasted, exactly once"""
+    text = cleanup_text(text, mode_key)
+    # Apply profanity filter if enabled
+    if enabled(MODES.get(mode_key, {}).get('profanity_filter', False)):
+        text = filter_profanity(text, mode_key)
+    return text
 
 
 def callback(indata, frames, time_info, status):
-    """Audio callback"""
-    if recording:
-        audio_queue.put(indata.copy())
+    """Audio callback
+    
+    Always writes to the ring, even when not recording, so the moments
+    before the hotkey press are available as pre-roll.
+    """
+    capture.write(resampler.process(indata) if resampler else indata)
 
 
-def transcribe(filename):
-    """Send to Groq Whisper"""
-    global current_mode
-    
+async def request_transcript(audio_data, filename, mode_key, final=False, audio_seconds=0.0, **options):
+    """One API request with the mode's settings, returns the Transcript"""
     # Get mode settings
-    mode_cfg = MODES.get(current_mode, {})
-    prompt = get_prompt(current_mode)
+    mode_cfg = MODES.get(mode_key, {})
+    # Short clips may go to a faster model, slow models to their fallback
     model = mode_cfg.get('model', 'whisper-large-v3')
-    language = mode_cfg.get('language', 'ru')
-    temperature = mode_cfg.get('temperature', 0.0)
-    profanity_filter = mode_cfg.get('profanity_filter', False)
+    if router:
+        model = router.choose(model, audio_seconds, mode_cfg.get('routes'))
+    
+    result = await backend.atranscribe(
+        audio_data, filename,
+        model=model,
+        language=mode_cfg.get('language', 'ru'),
+        prompt=get_prompt(mode_key),
+        temperature=mode_cfg.get('temperature', 0.0),
+        audio_seconds=audio_seconds,
+        priority=FINAL if final else BACKGROUND,
+        **options,
+    )
+    if router and not result.timings.get('cached'):
+        router.record(model, result.timings['request'], audio_seconds)
+    if spool is not None:
+        spool_ready.set()  # the API works: send what was spooled
+    if result.timings.get('cached'):
+        print("♻️ Same audio as before: cached result, no API call")
+    return result
+
+
+async def transcribe_chunks(audio_data, filename, final, mode_key):
+    """Long clip: split at pauses, transcribe the chunks in parallel, stitch the text"""
+    audio, rate = await core.to_thread(decode_audio, audio_data)
+    stem = Path(filename).stem
     
-    client = Groq(api_key=API_KEY)
+    async def request(encoded, index, seconds):
+        result = await request_transcript(encoded, f"{stem}_part{index}{get_extension(UPLOAD_FORMAT)}", mode_key,
+                                          final, seconds, response_format='verbose_json',
+                                          timestamp_granularities=['word'])
+        return result.response
+    
+    start = time.perf_counter()
+    text, count = await transcribe_chunked(audio, rate, request, CHUNK_SECONDS, CHUNK_OVERLAP, CHUNK_WORKERS,
+                                           UPLOAD_FORMAT, OPUS_BITRATE, to_thread=core.to_thread)
+    print(f"🧩 {len(audio) / rate:.0f}s in {count} parallel chunks ({time.perf_counter() - start:.1f}s)")
+    return text
+
+
+async def transcribe(audio_data, filename="audio.wav", final=False, mode_key=None, spool_failures=True):
+    """Send to the configured API backend (Groq Whisper by default)
+    
+    audio_data is the encoded audio file held in memory (bytes, BytesIO or
+    memoryview); filename only tells the API which container it is.
+    final marks the stop segment, which goes first when rate-limited.
+    mode_key is the mode the segment was recorded in (default: current).
+    Returns the raw transcript (postprocess_text() cleans it up).
+    If the request fails for good with an error a later retry could fix
+    (network, 429, 5xx), the audio goes to the spool; errors like 400/401
+    are only reported. With spool_failures=False the error is raised.
+    """
+    mode_key = mode_key or current_mode
+    
+    if isinstance(audio_data, io.BytesIO):
+        audio_data = audio_data.getvalue()
+    elif isinstance(audio_data, memoryview):
+        audio_data = audio_data.tobytes()
+    
+    audio_seconds = audio_duration(audio_data)
     
     try:
-        with open(filename, "rb") as f:
-            # Build API params
-            params = {
-                'file': (filename, f.read()),
-                'model': model,
-                'response_format': 'json',
-                'prompt': prompt,
-                'temperature': temperature
-            }
-            # Only set language if not 'auto'
-            if language and language != 'auto':
-                params['language'] = language
-            
-            result = client.audio.transcriptions.create(**params)
-        
-        text = result.text
-        
-        # Apply cleanup if enabled for this mode
-        if should_cleanup(current_mode):
-            text = cleanup_text(text, current_mode)
-        
-        # Apply profanity filter if enabled
-        if profanity_filter:
-            text = filter_profanity(text)
-        
+        if CHUNK_LONG and audio_seconds > CHUNK_MIN:
+            text = await transcribe_chunks(audio_data, filename, final, mode_key)
+        else:
+            text = (await request_transcript(audio_data, filename, mode_key, final, audio_seconds)).text
         return text
     except Exception as e:
+        if not spool_failures:
+            raise
         print(f"\n❌ Error: {e}")
         if indicator:
             indicator.show_error(str(e)[:40])
+        if spool is not None and is_retryable(e):
+            try:
+                await core.to_thread(spool.add, audio_data, filename, mode_key, final, str(e))
+                print(f"📥 Kept in spool/ ({len(spool)} waiting), the text will be in the transcription log")
+            except OSError as spool_error:
+                print(f"❌ Spool failed: {spool_error}")
         return None
 
 
-def filter_profanity(text):
-    """Simple profanity filter - replaces offensive words with ***"""
-    # Russian profanity patterns (common roots)
-    profanity_patterns = [
-        r'\b[хx][уy][йеёия]\w*', r'\b[пp][иiu][зz][дd]\w*', r'\b[бb][лl][яa]\w*',
-        r'\b[еe][бb]\w*', r'\b[сc][уy][кk]\w*', r'\bдерьм\w*', r'\bмудак\w*',
-        r'\bпидор\w*', r'\bхер\w*', r'\bжоп\w*'
-    ]
-    for pattern in profanity_patterns:
-        text = re.sub(pattern, '***', text, flags=re.IGNORECASE)
-    return text
+async def update_spool(fn, *args):
+    """Run spool.attempted()/done() on the stage pool, reporting disk errors.
+    
+    Raised, they would end drain_spool and nothing spooled would be sent again.
+    """
+    try:
+        await core.to_thread(fn, *args)
+    except OSError as e:
+        print(f"❌ Spool update failed: {e}")
+
+
+async def resend_spooled(entry):
+    """Transcribe one spooled segment into the log.
+    
+    The text always goes to the transcription log, even with log_texts
+    off: it is the only place a recovered segment ends up. Returns False
+    if the API still looks down (a retryable error), True otherwise.
+    """
+    mode = entry['mode'] if entry['mode'] in MODES else current_mode
+    try:
+        data = await core.to_thread(spool.read, entry)
+        text = await transcribe(data, entry['filename'], mode_key=mode, spool_failures=False)
+    except Exception as e:
+        await update_spool(spool.attempted, entry, e, not is_retryable(e))
+        return not is_retryable(e)  # this entry is bad, the API is fine
+    if text:
+        text = postprocess_text(text, mode)
+    from datetime import datetime
+    recorded = datetime.fromtimestamp(entry['created']).strftime("%d.%m %H:%M")
+    if text:
+        try:
+            await core.to_thread(log_text, text, mode, f"spooled, recorded {recorded}", True)
+        except OSError as e:
+            # Keep the audio until the text can be written
+            print(f"❌ Could not log spooled segment from {recorded}: {e}")
+            await update_spool(spool.attempted, entry, e)
+            return True
+    await update_spool(spool.done, entry)
+    print(f"📬 Spooled segment from {recorded} sent{' → log' if text else ' (no speech)'}, {len(spool)} left")
+    return True
+
+
+async def drain_spool():
+    """Background task on the core loop: re-send spooled segments in batches.
+    
+    Waits drain_interval seconds (doubling while the API stays down, up to
+    10 min), or less when a live request succeeds. The oldest segment goes
+    first as a probe; the rest of the batch only if the API answered. A
+    segment the API rejects (400/401/413) does not back off the others.
+    """
+    interval = SPOOL.get('drain_interval', 30)
+    batch = SPOOL.get('batch', 4)
+    delay = 0 if len(spool) else interval  # left over from the last run: try right away
+    while True:
+        try:
+            await asyncio.wait_for(spool_ready.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        spool_ready.clear()
+        entries = spool.pending(batch)
+        if not entries:
+            delay = interval
+            continue
+        if not await resend_spooled(entries[0]):
+            delay = min(max(delay, interval) * 2, 600)
+            continue
+        delay = interval
+        if all(await asyncio.gather(*(resend_spooled(entry) for entry in entries[1:]))) and len(spool):
+            spool_ready.set()  # healthy and more waiting: next batch right away
+
+
+def filter_profanity(text, mode_key):
+    """Profanity filter - replaces words starting with the mode's roots with ***"""
+    return profanity.censor(text, mode_key)
+
+
+def new_trimmer():
+    """Silence trimmer for the next segment (None if trimming is off)"""
+    if not TRIM_SILENCE:
+        return None
+    return SilenceTrimmer(SAMPLE_RATE, max_pause=MAX_PAUSE, pad=SILENCE_PAD)
+
+
+def new_stretcher(mode_key):
+    """Speech speed-up for the mode (None unless its speedup is above 1.0)"""
+    rate = MODES.get(mode_key, {}).get('speedup', 1.0)
+    try:
+        rate = min(float(rate), 2.0)
+    except (TypeError, ValueError):
+        return None
+    if rate <= 1.0:
+        return None
+    return TimeStretcher(rate, SAMPLE_RATE)
+
+
+def rotate_encoder(restart=False):
+    """Swap out the streaming encoder, optionally starting the next one at the read position.
+    
+    Returns the old encoder (or None) for finish_encoder(). The swap itself
+    is instant, so it can run on the core loop.
+    """
+    global encoder
+    old = encoder
+    encoder = None
+    if restart:
+        encoder = StreamingEncoder(capture, capture.read_pos, UPLOAD_FORMAT, OPUS_BITRATE,
+                                   trimmer=new_trimmer(), stretcher=new_stretcher(current_mode)).start()
+    return old
+
+
+async def finish_encoder(old, end_pos):
+    """Finish a rotated-out encoder at end_pos on the thread pool.
+    
+    Returns (encoded, stream) where stream is the finished StreamingEncoder
+    (for its trimmer/stretcher stats); encoded is None if the segment has
+    to be encoded in one go.
+    """
+    if old is None:
+        return None, None
+    try:
+        return await core.to_thread(old.finish, end_pos), old
+    except Exception as e:
+        print(f"[DEBUG] Encoder finish error: {e}")
+        return None, None
+
+
+def log_trim(trimmer, encoded_size):
+    """Log how much silence was cut from a segment"""
+    stats = trimmer.stats()
+    removed = stats['input'] - stats['kept']
+    if removed < 0.1:
+        return
+    saved = encoded_size * removed / stats['kept'] if stats['kept'] else 0
+    print(f"✂️ Trimmed {removed:.1f}s silence (lead {stats['leading']:.1f}s, "
+          f"pauses {stats['interior']:.1f}s, tail {stats['trailing']:.1f}s): "
+          f"{stats['input']:.1f}s → {stats['kept']:.1f}s, ~{saved / 1024:.0f} KB less upload")
+
+
+def encode_segment(audio, encoded=None, stream=None, mode_key=None):
+    """Trim, speed up and encode a segment unless the streaming encoder already did.
+    
+    Returns None if the segment contains no speech.
+    """
+    if encoded is None or stream is None:
+        trimmer = new_trimmer()
+        stretcher = new_stretcher(mode_key or current_mode)
+        if trimmer:
+            audio = np.concatenate((trimmer.feed(audio), trimmer.flush()))
+        if stretcher:
+            audio = np.concatenate((stretcher.feed(audio), stretcher.flush()))
+        encoded = encode_audio(audio, SAMPLE_RATE, UPLOAD_FORMAT, OPUS_BITRATE)
+    else:
+        trimmer, stretcher = stream.trimmer, stream.stretcher
+    if trimmer:
+        log_trim(trimmer, len(encoded))
+        if not trimmer.has_speech():
+            return None
+    if stretcher:
+        print(f"⏩ Sped up {stretcher.rate:g}x: {stretcher.input_samples / SAMPLE_RATE:.1f}s → "
+              f"{stretcher.output_samples / SAMPLE_RATE:.1f}s")
+    return encoded
+
+
+def save_recording_async(audio, segment=False):
+    """Archive recorded audio to recordings/ in the background.
+    
+    `audio` is the segment as captured (a copy taken when it was cut, see
+    save_audio): silence trimming and speed-up only change what is uploaded.
+    """
+    from datetime import datetime
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    def _save():
+        recordings_dir = SCRIPT_DIR / "recordings"
+        recordings_dir.mkdir(exist_ok=True)
+        saved_path = recordings_dir / f"recording_{timestamp}{get_extension(UPLOAD_FORMAT)}"
+        label = "Segment saved" if segment else "Saved"
+        try:
+            saved_path.write_bytes(encode_audio(audio, SAMPLE_RATE, UPLOAD_FORMAT, OPUS_BITRATE))
+            print(f"💾 {label}: {saved_path.name}")
+        except Exception as e:
+            print(f"❌ {label.split()[0]} save failed: {e}")
+    
+    threading.Thread(target=_save, daemon=True).start()
 
 
 def clear_line():
@@ -293,10 +538,13 @@ def clear_line():
     sys.stdout.flush()
 
 
-def show_timer():
-    """Show recording timer"""
-    global recording, record_start_time
-    while recording:
+async def show_timer(session):
+    """Show recording timer; cut segments at max_duration and phrases at pauses.
+    
+    Runs as a task on the core loop until the recording (session) ends;
+    cuts go through the command queue so they never interleave with stop.
+    """
+    while recording and core.session == session:
         elapsed = time.time() - record_start_time
         remaining = MAX_DURATION - elapsed
         
@@ -314,176 +562,354 @@ def show_timer():
             # Show brief feedback in indicator
             if indicator and USE_INDICATOR:
                 indicator.show_processing()  # Brief "Sending..." flash
-            # Process current segment in background, recording continues
-            process_segment()
+            # Cut at the quietest point before the deadline and process that
+            # segment in background; the remainder carries over, recording continues
+            if PIPELINED:
+                await core.command(submit_phrase, find_split_point())
+            else:
+                await core.command(process_segment, find_split_point())
             # Restore recording display after brief moment
-            if indicator and USE_INDICATOR:
-                time.sleep(0.3)
+            if indicator and USE_INDICATOR and recording:
+                await asyncio.sleep(0.3)
                 indicator.start_recording(get_mode_name(current_mode))
             # Timer was reset by process_segment, loop continues
             continue
         
-        time.sleep(0.5)
+        # Pipelined mode: send each finished phrase while recording goes on
+        if PIPELINED and phrase_ended():
+            await core.command(submit_phrase, encoder.position)
+        
+        await asyncio.sleep(0.5)
+
+
+def reload_modes():
+    """Pick up mode settings saved by the settings UI since the last recording.
+    
+    Only config.json's modification time is checked (once per recording);
+    when it changed, MODES is reloaded in place (with global.save_audio)
+    and the compiled cleanup rules and profanity filters are dropped.
+    Other settings still need a restart.
+    """
+    global config_mtime, SAVE_AUDIO
+    try:
+        mtime = config.path.stat().st_mtime
+    except OSError:
+        mtime = None
+    if mtime == config_mtime:
+        cleanup.refresh()  # a vocabulary file may have changed
+        profanity.refresh()  # or a profanity roots file
+        return
+    config_mtime = mtime
+    current = config.load()
+    modes = current.get('modes', {})
+    SAVE_AUDIO = current.get('global', {}).get('save_audio', False)
+    MODES.clear()
+    MODES.update(modes)
+    cleanup.invalidate()
+    profanity.invalidate()
+    print("⚙️ Mode settings reloaded")
 
 
 def do_start_recording():
-    """Start recording"""
+    """Start recording (command on the core loop)"""
     global recording, record_start_time
     
     if recording:
         return
     
-    try:
-        # Clear queue
-        with audio_queue.mutex:
-            audio_queue.queue.clear()
-        
-        recording = True
-        record_start_time = time.time()
-        
-        print()  # New line
-        
-        # Show indicator
-        if indicator and USE_INDICATOR:
-            try:
-                indicator.start_recording(get_mode_name(current_mode))
-            except Exception as e:
-                print(f"[DEBUG] Indicator error: {e}")
-        
-        # Start timer thread
-        timer_thread = threading.Thread(target=show_timer, daemon=True)
-        timer_thread.start()
-        
-        print("[DEBUG] Recording started successfully!")
-    except Exception as e:
-        print(f"[ERROR] do_start_recording crashed: {e}")
-        import traceback
-        traceback.print_exc()
+    reload_modes()
+    # Start from the pre-roll so the first syllable is never clipped
+    capture.start_from(int(PREROLL * SAMPLE_RATE))
+    # Connection is hot by the time the first segment is sent
+    core.spawn(backend.aprewarm())
+    phrase_futures.clear()
+    session = core.new_session()
+    rotate_encoder(restart=True)
+    
+    recording = True
+    record_start_time = time.time()
+    
+    print()  # New line
+    
+    # Show indicator
+    if indicator and USE_INDICATOR:
+        try:
+            indicator.start_recording(get_mode_name(current_mode))
+        except Exception as e:
+            print(f"[DEBUG] Indicator error: {e}")
+    
+    # Timer task on the core loop
+    core.spawn(show_timer(session))
+    emit('recording_started', session=session, mode=current_mode)
+    
+    print("[DEBUG] Recording started successfully!")
+
+
+def take_audio(frames=None):
+    """capture.take(), announcing audio lost to a ring buffer overrun since the last call"""
+    global overruns_reported
+    audio = capture.take(frames)
+    lost = capture.overruns - overruns_reported
+    if lost:
+        overruns_reported = capture.overruns
+        print(f"⚠️ Audio buffer overrun: {lost / SAMPLE_RATE:.1f}s of audio lost")
+        emit('overrun', seconds=round(lost / SAMPLE_RATE, 3))
+    return audio
+
+
+def find_split_point():
+    """Absolute capture position of the quietest moment in the last SPLIT_WINDOW seconds"""
+    end = capture.write_pos
+    start = max(capture.read_pos, end - int(SPLIT_WINDOW * SAMPLE_RATE))
+    window = capture.view(start, end)
+    return start + find_quietest_point(window, SAMPLE_RATE)
+
+
+def phrase_ended():
+    """True when enough speech is buffered and the speaker has paused (needs trim_silence)"""
+    enc = encoder
+    if enc is None or enc.trimmer is None:
+        return False
+    spoken = (enc.position - capture.read_pos) / SAMPLE_RATE
+    return spoken >= PHRASE_MIN and enc.trimmer.trailing_silence() >= PHRASE_PAUSE
+
+
+async def submit_phrase(end_pos):
+    """Pipelined mode: transcribe audio up to end_pos in the background (command).
+    
+    Results are kept in order and joined with the final tail at stop.
+    """
+    global record_start_time
+    
+    if not recording:
+        return
+    session = core.session
+    audio = take_audio(end_pos - capture.read_pos)
+    end = capture.read_pos
+    encoded, stream = await finish_encoder(rotate_encoder(restart=True), end)
+    if encoded is None or SAVE_AUDIO:
+        # Encoded later by a worker or archived: copy, the ring keeps being written
+        audio = audio.copy()
+    
+    carried = (capture.write_pos - capture.read_pos) / SAMPLE_RATE
+    record_start_time = time.time() - carried
+    
+    if len(audio) / SAMPLE_RATE < 0.5:
+        return
+    
+    index = len(phrase_futures)
+    job = Job(session, kind='phrase', audio=audio, encoded=encoded, stream=stream, mode=current_mode,
+              filename=f"phrase_{index}{get_extension(UPLOAD_FORMAT)}",
+              archive=SAVE_AUDIO, phrases=())
+    # Waits for a pipeline slot in the background, not in the command queue
+    phrase_futures.append(core.queue(job, ordered=False))
 
 
-def process_segment():
-    """Process current audio segment without stopping recording (for auto-segmentation)"""
+async def process_segment(end_pos=None):
+    """Process current audio segment without stopping recording (command, for auto-segmentation)
+    
+    Audio up to end_pos (default: everything captured) becomes the segment;
+    anything after it stays in the buffer as the start of the next one.
+    """
     global record_start_time
     
-    # Collect audio from queue
-    data = []
-    while not audio_queue.empty():
-        data.append(audio_queue.get())
+    if not recording:
+        return
+    session = core.session
+    
+    # Take the segment (zero-copy view into the ring)
+    frames = None if end_pos is None else end_pos - capture.read_pos
+    audio = take_audio(frames)
+    end = capture.read_pos
+    encoded, stream = await finish_encoder(rotate_encoder(restart=True), end)
+    if encoded is None or SAVE_AUDIO:
+        # Encoded later by a worker or archived: copy, the ring keeps being written
+        audio = audio.copy()
     
-    if not data:
+    # Reset timer for next segment, counting the carried-over remainder
+    carried = (capture.write_pos - capture.read_pos) / SAMPLE_RATE
+    record_start_time = time.time() - carried
+    
+    if len(audio) == 0:
         return
     
-    audio = np.concatenate(data, axis=0)
     duration = len(audio) / SAMPLE_RATE
     
     if duration < 0.5:
         return
     
-    # Reset timer for next segment
-    record_start_time = time.time()
+    # Through the pipeline; the result is pasted in recording order. Waits for
+    # a pipeline slot in the background so stop and mode switches are not held up
+    from datetime import datetime
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    job = Job(session, kind='segment', audio=audio, encoded=encoded, stream=stream, mode=current_mode,
+              filename=f"segment_{timestamp}{get_extension(UPLOAD_FORMAT)}",
+              archive=SAVE_AUDIO, phrases=())
+    core.queue(job)
+
+
+# --- Pipeline stages (CorePipeline runs jobs through them in this order) ---
+
+def encode_stage(job):
+    """Trim, speed up and encode unless the stream already did (thread pool)"""
+    data = None
+    if job.audio is not None:
+        data = encode_segment(job.audio, job.encoded, job.stream, job.mode)
+        if data is not None and job.archive:
+            save_recording_async(job.audio, segment=job.kind != 'final')
+    job.audio = None
+    job.data = data
+    if data is not None:
+        return job
+    if job.kind == 'segment':
+        print("⚠️ Segment: no speech")
+    if job.phrases:
+        return job  # pipelined: the phrases sent earlier still count
+    if job.kind == 'final':
+        print("⚠️ No speech")
+        if indicator:
+            indicator.hide()
+    return None
+
+
+async def transcribe_stage(job):
+    """Upload with async HTTP (on the core loop, cancelled by ESC)"""
+    job.text = None
+    if job.data is not None:
+        job.text = await transcribe(job.data, job.filename, final=job.kind == 'final', mode_key=job.mode)
+    return job
+
+
+def cleanup_stage(job):
+    """Remove garbage phrases, filler words and profanity, once per segment (thread pool)"""
+    if job.text:
+        job.text = postprocess_text(job.text, job.mode)
+    return job
+
+
+async def join_stage(job):
+    """Pipelined mode: join the phrases sent earlier with the tail, in order"""
+    if job.phrases:
+        parts = [phrase.text if phrase else None for phrase in await asyncio.gather(*job.phrases)]
+        job.text = ' '.join(part for part in parts + [job.text] if part) or None
+        print(f"🧩 Joined {len(job.phrases)} phrase(s) + tail")
+    if not job.text:
+        if job.kind == 'final':
+            print("⚠️ No result")
+            if indicator:
+                indicator.hide()
+        return None
+    if job.kind == 'final' and core.pending() > 1:
+        print(f"⏳ Waiting for {core.pending() - 1} earlier segment(s)...")
+    return job
+
+
+PIPELINE_STAGES = [
+    ('encode', encode_stage),
+    ('transcribe', transcribe_stage),
+    ('cleanup', cleanup_stage),
+    ('join', join_stage),
+]
+
+
+def emit(event, **fields):
+    """Publish an event to local subscribers (never blocks, any thread)"""
+    if events:
+        events.publish(event, **fields)
+
+
+def stage_timings(job):
+    """Seconds per pipeline stage (and delivery), rounded for events"""
+    return {stage: round(seconds, 4) for stage, seconds in job.timings.items()}
+
+
+def log_text(text, mode, note, always=False):
+    """Append a result to today's transcription log if log_texts is on (or always), returns the log path"""
+    from datetime import datetime
+    log_texts = cfg.get('global', {}).get('log_texts', True)
+    if not (log_texts or always):
+        return None
+    recordings_dir = SCRIPT_DIR / "recordings"
+    recordings_dir.mkdir(exist_ok=True)
+    # Log file per day
+    date_only = datetime.now().strftime("%Y%m%d")
+    log_path = recordings_dir / f"transcription_log_{date_only}.txt"
+    with open(log_path, 'a', encoding='utf-8') as f:
+        time_only = datetime.now().strftime("%H:%M:%S")
+        f.write(f"\n[{time_only}] {get_mode_name(mode)} ({note})\n{text}\n")
+    return log_path
+
+
+def deliver_result(job):
+    """Send one result to the output sink and log it (output thread, strictly in recording order)"""
+    kind, text, mode = job.kind, job.text, job.mode
+    elapsed = time.perf_counter() - job.created
     
-    # Process in background
-    def _process():
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        recordings_dir = SCRIPT_DIR / "recordings"
-        recordings_dir.mkdir(exist_ok=True)
-        
-        try:
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                sf.write(tmp.name, audio, SAMPLE_RATE)
-                tmp_path = tmp.name
-        except Exception as e:
-            print(f"Error creating temp file: {e}")
-            return
+    if kind == 'segment':
+        print(f"📝 Segment: {text[:50]}...")
+        job.timings['deliver'] = output.deliver(text)
+        emit('segment', session=job.session, mode=mode, text=text, timings=stage_timings(job))
         
-        try:
-            text = transcribe(tmp_path)
-        except Exception as e:
-            print(f"Error in transcribe: {e}")
-            text = None
-        
-        if text:
-            try:
-                text = cleanup_text(text, current_mode)
-            except Exception as e:
-                print(f"Error in cleanup_text: {e}")
-        
-        # Save audio if enabled
-        import json
-        config_path = SCRIPT_DIR / "config.json"
-        try:
-            with open(config_path, 'r', encoding='utf-8-sig') as f:
-                current_cfg = json.load(f)
-            save_audio = current_cfg.get('global', {}).get('save_audio', False)
-        except Exception as e:
-            save_audio = False
-        
-        if save_audio:
-            import shutil
-            saved_path = recordings_dir / f"recording_{timestamp}.wav"
-            try:
-                shutil.copy(tmp_path, saved_path)
-                print(f"💾 Segment saved: {saved_path.name}")
-            except Exception as e:
-                print(f"❌ Segment save failed: {e}")
-        
-        os.remove(tmp_path)
-        
-        if text:
-            print(f"📝 Segment: {text[:50]}...")
-            pyperclip.copy(text)
-            time.sleep(0.1)
-            # Use pynput Controller for Ctrl+V (no admin needed)
-            kb = pynput_keyboard.Controller()
-            kb.press(pynput_keyboard.Key.ctrl)
-            kb.press('v')
-            kb.release('v')
-            kb.release(pynput_keyboard.Key.ctrl)
-            
-            # Log texts if enabled
-            log_texts = cfg.get('global', {}).get('log_texts', True)
-            if log_texts:
-                date_only = datetime.now().strftime("%Y%m%d")
-                log_path = recordings_dir / f"transcription_log_{date_only}.txt"
-                with open(log_path, 'a', encoding='utf-8') as f:
-                    time_only = datetime.now().strftime("%H:%M:%S")
-                    f.write(f"\n[{time_only}] {get_mode_name(current_mode)} (segment)\n{text}\n")
+        # Log texts if enabled
+        log_text(text, mode, "segment")
+        return
     
-    threading.Thread(target=_process, daemon=True).start()
+    # Deliver first: everything below is bookkeeping the user does not wait for
+    job.timings['deliver'] = output.deliver(text)
+    emit('final', session=job.session, mode=mode, text=text, seconds=round(elapsed, 3), timings=stage_timings(job))
+    preview = text[:100] + '...' if len(text) > 100 else text
+    print(f"✅ ({elapsed:.1f}s, {output.name} {job.timings['deliver'] * 1000:.0f} ms): {preview}")
+    
+    # Check log_texts setting and save to log
+    log_path = log_text(text, mode, f"{elapsed:.1f}s")
+    if log_path:
+        print(f"📝 Logged to: {log_path.name}")
+    
+    # Show result in indicator
+    if indicator and USE_INDICATOR:
+        indicator.show_result(text, elapsed)
 
 
-def do_stop_and_process():
-    """Stop and process recording"""
-    global recording
+async def do_stop_and_process():
+    """Stop and process recording (command on the core loop)"""
+    global recording, stopping
     
     if not recording:
         return
     
     recording = False
+    stopping = True
+    session = core.session
     clear_line()
+    emit('recording_stopped', session=session, mode=current_mode, seconds=round(time.time() - record_start_time, 3))
     
     # Update indicator
     if indicator and USE_INDICATOR:
         indicator.stop_recording()
         indicator.show_processing()
     
-    # Collect audio
-    data = []
-    while not audio_queue.empty():
-        data.append(audio_queue.get())
+    try:
+        # Collect audio (zero-copy view into the ring); the streaming encoder
+        # only has the last fraction of a second left to encode
+        audio = take_audio()
+        end = capture.read_pos
+        encoded, stream = await finish_encoder(rotate_encoder(), end)
+    finally:
+        stopping = False
     
-    if not data:
+    # Phrases already sent in pipelined mode
+    phrases = list(phrase_futures)
+    phrase_futures.clear()
+    
+    if len(audio) == 0 and not phrases:
         print("⚠️ No audio")
         if indicator:
             indicator.hide()
         return
     
-    audio = np.concatenate(data, axis=0)
     duration = len(audio) / SAMPLE_RATE
     
-    if duration < 0.5:
+    if duration < 0.5 and not phrases:
         print("⚠️ Too short")
         if indicator:
             indicator.hide()
@@ -493,84 +919,44 @@ def do_stop_and_process():
     secs = int(duration) % 60
     print(f"⏳ Processing {mins}:{secs:02d}...")
     
-    # Create recordings folder if needed
-    recordings_dir = SCRIPT_DIR / "recordings"
-    recordings_dir.mkdir(exist_ok=True)
-    
     # Generate timestamp for filenames
     from datetime import datetime
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
-    # Save and transcribe
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-        sf.write(tmp.name, audio, SAMPLE_RATE)
-        tmp_path = tmp.name
-    
-    start = time.time()
-    text = transcribe(tmp_path)
-    elapsed = time.time() - start
-    
-    # ALWAYS run cleanup to remove garbage phrases (Whisper hallucinations)
-    # and filler words (if enabled for this mode)
-    if text:
-        text = cleanup_text(text, current_mode)
-    
-    # Check save_audio setting from config (reload to get current value)
-    import json
-    config_path = SCRIPT_DIR / "config.json"  # FIXED: was CONFIG_PATH (undefined)
-    try:
-        with open(config_path, 'r', encoding='utf-8-sig') as f:  # utf-8-sig handles BOM
-            current_cfg = json.load(f)
-        save_audio = current_cfg.get('global', {}).get('save_audio', False)
-        print(f"[DEBUG] save_audio = {save_audio}")
-    except Exception as e:
-        print(f"[DEBUG] save_audio error: {e}")
-        save_audio = False
-    if save_audio:
-        # Copy to recordings folder with timestamp
-        import shutil
-        saved_path = recordings_dir / f"recording_{timestamp}.wav"
-        try:
-            shutil.copy(tmp_path, saved_path)
-            print(f"💾 Saved: {saved_path.name}")
-        except Exception as e:
-            print(f"❌ Save failed: {e}")
+    if duration < 0.5:
+        audio = None  # only the phrases are left
+    elif encoded is None or SAVE_AUDIO:
+        audio = audio.copy()  # encoded by a worker or archived, the ring keeps being written
     
-    # Clean up temp file
-    os.remove(tmp_path)
+    # Delivered after earlier segments still in flight; never waits for a slot
+    # or for a stage worker busy with background segments
+    job = Job(session, kind='final', audio=audio, encoded=encoded, stream=stream, mode=current_mode,
+              filename=f"recording_{timestamp}{get_extension(UPLOAD_FORMAT)}",
+              archive=SAVE_AUDIO, phrases=phrases)
+    await core.submit(job, slot=False, express=True)
+
+
+def cancel_recording():
+    """ESC: discard the recording, or the results not yet pasted (runs ahead of queued commands)"""
+    global recording, encoder
+    session = core.session
     
-    if text:
-        preview = text[:100] + '...' if len(text) > 100 else text
-        print(f"✅ ({elapsed:.1f}s): {preview}")
-        
-        # Check log_texts setting and save to log
-        log_texts = cfg.get('global', {}).get('log_texts', True)
-        if log_texts:
-            # Log file per day
-            date_only = datetime.now().strftime("%Y%m%d")
-            log_path = recordings_dir / f"transcription_log_{date_only}.txt"
-            with open(log_path, 'a', encoding='utf-8') as f:
-                time_only = datetime.now().strftime("%H:%M:%S")
-                mode_name = get_mode_name(current_mode)
-                f.write(f"\n[{time_only}] {mode_name} ({elapsed:.1f}s)\n")
-                f.write(text + "\n")
-            print(f"📝 Logged to: {log_path.name}")
-        
-        # Show result in indicator
-        if indicator and USE_INDICATOR:
-            indicator.show_result(text, elapsed)
-        
-        # Copy and paste
-        pyperclip.copy(text)
-        time.sleep(0.1)
-        # Use pynput Controller for Ctrl+V (no admin needed)
-        kb = pynput_keyboard.Controller()
-        kb.press(pynput_keyboard.Key.ctrl)
-        kb.press('v')
-        kb.release('v')
-        kb.release(pynput_keyboard.Key.ctrl)
-    else:
-        print("⚠️ No result")
+    if recording:
+        recording = False
+        # Discard captured audio and phrases already sent
+        capture.clear()
+        phrase_futures.clear()
+        core.cancel_session()
+        if encoder:
+            encoder.cancel()
+            encoder = None
+        print("⏹️ Recording cancelled")
+        emit('cancelled', session=session, stage='recording')
+        if indicator:
+            indicator.hide()
+    elif core.cancel_session() or stopping:
+        print("⏹️ Processing cancelled")
+        emit('cancelled', session=session, stage='processing')
         if indicator:
             indicator.hide()
 
@@ -584,10 +970,27 @@ def switch_mode(mode_key):
         print(f"🔄 Mode: {get_mode_name(mode_key)}")
 
 
+def hotkey_pressed():
+    """Hotkey down (command): toggle, or start in hold mode"""
+    # Toggle mode
+    if INPUT_MODE == 'toggle':
+        if not recording:
+            return do_start_recording()
+        return do_stop_and_process()
+    # Hold mode - start on press
+    if not recording:
+        return do_start_recording()
+
+
+def hotkey_released():
+    """Hotkey up (command): stop in hold mode"""
+    if INPUT_MODE == 'hold' and recording:
+        print("[DEBUG] Stopping recording (key released)...")
+        return do_stop_and_process()
+
+
 def on_press(key):
-    """Handle key press events (pynput)"""
-    global recording
-    
+    """Handle key press events (pynput listener thread: hand off only)"""
     # Get key name
     try:
         key_name = key.char if hasattr(key, 'char') and key.char else str(key)
@@ -598,50 +1001,38 @@ def on_press(key):
     is_hotkey = (key == HOTKEY_KEY or HOTKEY_NAME in key_name.lower())
     
     if is_hotkey:
-        # Toggle mode
-        if INPUT_MODE == 'toggle':
-            if not recording:
-                do_start_recording()
-            else:
-                do_stop_and_process()
-        # Hold mode - start on press
-        elif not recording:
-            do_start_recording()
+        core.post(hotkey_pressed)
 
 def on_release(key):
-    """Handle key release events (pynput)"""
-    global recording
-    
+    """Handle key release events (pynput listener thread: hand off only)"""
     # Check for configured hotkey
     is_hotkey = (key == HOTKEY_KEY)
     
     # Hold mode - stop on release
-    if is_hotkey and INPUT_MODE == 'hold' and recording:
-        print("[DEBUG] Stopping recording (key released)...")
-        do_stop_and_process()
+    if is_hotkey and INPUT_MODE == 'hold':
+        core.post(hotkey_released)
     
     # ESC to cancel current recording (not exit!)
     if key == pynput_keyboard.Key.esc:
-        if recording:
-            recording = False
-            # Clear audio queue
-            while not audio_queue.empty():
-                try:
-                    audio_queue.get_nowait()
-                except:
-                    pass
-            print("⏹️ Recording cancelled")
-            if indicator:
-                indicator.hide()
+        core.interrupt(cancel_recording)
+
+
+def get_device_rate():
+    """Default sample rate of the input device (SAMPLE_RATE if unknown)"""
+    try:
+        return int(sd.query_devices(kind='input')['default_samplerate'])
+    except Exception as e:
+        print(f"[DEBUG] Device rate query failed: {e}")
+        return SAMPLE_RATE
 
 
 def main():
-    global indicator, current_mode
+    global indicator, current_mode, core, resampler, backend, spool, router, events
     
     print("=" * 50)
     print("🎤 VoiceGrab v4.0")
     print("=" * 50)
-    print(f"API: {'✅' if API_KEY else '❌ Missing!'}")
+    print(f"API: {'✅' if API_KEY or PROVIDER != 'groq' else '❌ Missing!'} ({PROVIDER})")
     print(f"Mode: {get_mode_name(current_mode)}")
     print(f"Input: {'Toggle' if INPUT_MODE == 'toggle' else 'Hold'}")
     print(f"Max: {MAX_DURATION}s")
@@ -654,20 +1045,28 @@ def main():
     print("   Right-click tray icon = Settings")
     print("=" * 50)
     
-    if not API_KEY:
+    if PIPELINED and not TRIM_SILENCE:
+        # Pauses between phrases are found by the silence trimmer
+        print("\n⚠️ recording.pipelined needs trim_silence: phrases are not sent while recording")
+    
+    if not API_KEY and PROVIDER == 'groq':
         print("\n⚠️ Run: python voicegrab_launcher.py --settings")
         print("   to configure API key")
         return
     
+    # Core event loop: owns the recording state, runs segments through the
+    # stages (bounded, results pasted in recording order)
+    core = CorePipeline(PIPELINE_STAGES, deliver_result, workers=SEGMENT_WORKERS,
+                        max_pending=MAX_PENDING_SEGMENTS).start()
+    
     # Start system tray
     tray = None
     try:
         from system_tray import SystemTray
         
         def on_mode_change(mode):
-            global current_mode
-            current_mode = mode
-            print(f"\n🔄 Mode: {get_mode_name(mode)}")
+            # Tray thread: the core loop owns current_mode
+            core.post(switch_mode, mode)
         
         def close_settings_windows():
             """Find and close any VoiceGrab Settings windows (PowerShell only)"""
@@ -729,8 +1128,8 @@ def main():
             # Mode order for cycling
             MODE_ORDER = ['ai', 'code', 'docs', 'notes', 'chat']
             
-            def next_mode():
-                """Switch to next mode (click on indicator)"""
+            def cycle_mode():
+                """Switch to next mode (command on the core loop)"""
                 global current_mode
                 idx = MODE_ORDER.index(current_mode) if current_mode in MODE_ORDER else 0
                 next_idx = (idx + 1) % len(MODE_ORDER)
@@ -742,13 +1141,60 @@ def main():
                 if tray:
                     tray.set_mode(new_mode)
             
+            def next_mode():
+                """Switch to next mode (click on indicator, tkinter thread)"""
+                core.post(cycle_mode)
+            
             indicator = FloatingIndicator(max_duration=MAX_DURATION, on_mode_click=next_mode)
             indicator.run_in_thread()
         except Exception as e:
             print(f"⚠️ Indicator disabled: {e}")
     
+    # One pooled, keep-alive API backend for every request
+    policy = RequestPolicy(retries=RETRIES, hedge=HEDGE, hedge_delay=HEDGE_DELAY)
+    # The quotas are Groq's; self-hosted servers have none
+    limiter = RateLimiter(REQUESTS_PER_MINUTE, AUDIO_SECONDS_PER_HOUR) if PROVIDER == 'groq' else None
+    # The default routes and budgets name Groq's models; other servers only get what is configured
+    router = ModelRouter(ROUTES or (GROQ_ROUTES if PROVIDER == 'groq' else ()),
+                         MODEL_BUDGETS or (GROQ_MODELS if PROVIDER == 'groq' else {}))
+    cache = None
+    if CACHE.get('enabled', True):
+        # Cached results hold transcript text: on disk only if texts are logged anyway, or asked for
+        to_disk = CACHE.get('disk', False) or cfg.get('global', {}).get('log_texts', True)
+        cache = ResultCache(CACHE.get('memory_entries', 64), SCRIPT_DIR / "cache" if to_disk else None,
+                            int(CACHE.get('disk_mb', 50) * 1024 * 1024))
+    try:
+        backend = create_backend(PROVIDER, API_KEY, BASE_URL, STAND_IN, policy=policy, limiter=limiter, cache=cache)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    core.post(core.spawn, backend.aprewarm())
+    
+    # Segments that failed earlier (even before a crash) are re-sent in the background
+    if SPOOL.get('enabled', True):
+        spool = SegmentSpool(SCRIPT_DIR / "spool", max_attempts=SPOOL.get('max_attempts', 5))
+        if len(spool):
+            print(f"📥 {len(spool)} spooled segment(s) waiting to be sent")
+        core.post(core.spawn, drain_spool())
+    
+    # Local socket for editors and other apps (JSON lines, see event_server.py)
+    if EVENTS.get('enabled', False):
+        try:
+            events = EventServer(EVENTS.get('host', '127.0.0.1'), EVENTS.get('port', 8766),
+                                 EVENTS.get('unix_socket') or None, EVENTS.get('buffer', 256)).start()
+            print(f"📡 Events on {events.address}")
+        except OSError as e:
+            print(f"⚠️ Event server not started: {e}")
+    
+    # Open the device at its native rate and resample to SAMPLE_RATE ourselves,
+    # so the driver does not have to (avoids extra latency and xruns)
+    device_rate = get_device_rate() if NATIVE_RATE else SAMPLE_RATE
+    if device_rate != SAMPLE_RATE:
+        resampler = StreamResampler(device_rate, SAMPLE_RATE, channels=CHANNELS)
+        print(f"🎚️ Capture: {device_rate} Hz → {SAMPLE_RATE} Hz")
+    
     # Start audio stream
-    with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, callback=callback):
+    with sd.InputStream(samplerate=device_rate, channels=CHANNELS, callback=callback):
         print("\n✅ Ready! (Press AltGr to record, ESC to exit)\n")
         
         # Use pynput Listener (no admin rights needed!)
@@ -761,6 +1207,17 @@ def main():
     if tray:
         tray.stop()
     
+    if cache:
+        print(f"\n♻️ Cache: {cache.stats()}")
+    if router.histograms:
+        print("\n⏱️ Latency per model:")
+        for line in router.report():
+            print(f"   {line}")
+    if output.deliveries:
+        print(f"\n📋 Output: {output.summary()}")
+    output.close()
+    if events:
+        events.stop()
     print("\n👋 Bye!")
 
 